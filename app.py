@@ -1,512 +1,217 @@
 import streamlit as st
-from google import genai
-from scrape import get_profile
-import json
-from pydantic import BaseModel, ValidationError
-
-# Setup Gemini client
-client = genai.Client(api_key=st.secrets["GOOGLE_API_KEY"])
-
-# Defineing Pydantic model
-class ProfileContext(BaseModel):
-    experience_level: str
-    industry: str
-    career_stage: str
-    recent_career_type: str
-    total_work_experience: float
-    role_type: str
-    profile_completeness: int
+from scrape import get_profile_item, profile_cache
+import handlers
+from config import get_setting
+from metrics import metrics
+from model_router import model_usage
+from prefetch import cancel_prefetch, prefetched_answer, start_prefetch
+from profile_model import SECTIONS
+from scheduler import scheduler
+from session_store import history_view, load_window, session_store, trim_loaded
+from handlers import (analyze_profile, job_fit_table, new_conversation_memory, new_prompt_cache, process_user_query,
+                      quick_actions, response_cache, restore_session, score_job_titles, session_snapshot, suggested_roles_table)
+import itertools
+import uuid
+
+handlers.error_handler = st.error
 
 # Initialize session state
 if 'profile_context' not in st.session_state:
     st.session_state.profile_context = None
 if 'profile_data' not in st.session_state:
     st.session_state.profile_data = None
+if 'profile_item' not in st.session_state:
+    st.session_state.profile_item = None
+if 'profile' not in st.session_state:
+    st.session_state.profile = None
+if 'prompt_cache' not in st.session_state:
+    st.session_state.prompt_cache = new_prompt_cache()
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
-#memory 
-def get_conversation_memory():
-    """Get the last 10 conversations for context"""
-    if len(st.session_state.chat_history) <= 1:
-        return ""
-    
-    recent_messages = st.session_state.chat_history[-20:]
-    
-    memory_context = "\n\nPREVIOUS CONVERSATION CONTEXT:\n"
-    for i, message in enumerate(recent_messages):
-        role = "User" if message["role"] == "user" else "Assistant"
-        memory_context += f"{role}: {message['content']}\n"
-    
-    memory_context += "\nEND OF PREVIOUS CONVERSATION CONTEXT\n"
-    memory_context += "Please use this context to provide more relevant and personalized responses. Reference previous discussions when appropriate.\n\n"
-    
-    return memory_context
-# Function to get profile context from scraped data
-def get_profile_context(profile_data):
-    prompt = f"""
-    Analyze this LinkedIn profile and return JSON:
-    {profile_data}
-    
-    JSON format:
-    {{
-        "experience_level": "junior/mid-level/senior",
-        "industry": "Tech/Financial Services/Healthcare/Marketing and Advertising/Construction/Education/Retail" based on thair complete profile,
-        "career_stage": "early career/mid-career/late career/Director",
-        "recent_career_type": "full-time/part-time/internship/freelance/Founder/leadership/consulting/entrepreneurial",
-        "total_work_experience": work experience in Years in Float,
-        "role_type": "current role title",
-        "profile_completeness": "percentage completeness only in integer"
-    }}
-    """
-
-    response = client.models.generate_content(model='gemini-2.0-flash', contents=prompt)
-    text_response = response.text.strip()
-    
-    if text_response.startswith("```"):
-        text_response = text_response.strip("```json").strip("```").strip()
-
-    try:
-        parsed_dict = json.loads(text_response)
-        return ProfileContext(**parsed_dict)
-    except (json.JSONDecodeError, ValidationError) as e:
-        st.error(f"Error parsing profile context: {e}")
-        return None
-# getting industry based context 
-def industry_based_context():
-    industry_contexts = {
-        "Tech": "Fast-paced, emphasize technical skills, adaptability, innovation.",
-        "Financial Services": "Focus on analytical skills, attention to detail, financial regulations.",
-        "Healthcare": "Highlight empathy, patient care, medical practices knowledge.",
-        "Marketing and Advertising": "Emphasize creativity, communication, market trends.",
-        "Construction": "Value safety, project management, technical building expertise.",
-        "Education": "Focus on teaching methods, student engagement, curriculum development.",
-        "Retail": "Emphasize customer service, sales techniques, inventory management."
-    }
-    return industry_contexts.get(st.session_state.profile_context.industry, "General industry guidance.")
-#Content generation and rewrite agent based on experience and industry context
-def content_rewrite_or_generation(context, user_input):
-    memory_context = get_conversation_memory()
-    
-    if context.experience_level == "junior":
-        return f"""{memory_context}You are a linkedin guru. Be concise and give friendly response to the user
-        Optimizing or generating content asked in the query of the user
-        {user_input}
-        to the following LinkedIn profile's to match a junior level experience in the {context.industry} industry.
-        
-        PROFILE DATA:
-        {st.session_state.profile_data}
-
-        Following are the industry based context: {industry_based_context()}
-        
-        1. The asked section should be rewritten and optimized according to the years of experience {context.total_work_experience} and recently working in role {context.role_type} as {context.recent_career_type}.
-        2. Simplify technical language.
-        3. Include step-by-step guidance if needed.
-        4. Help user Optimize the section asked by the user to increase its hiring chances.
-        5. Include the Options or examples in markdown format that is easy to copy and paste.
-        6. Improve profile completeness from {context.profile_completeness}.
-        7. check if the number of connections is less i.e. number of connections in{st.session_state.profile_data},if so suggest to increase connections.
-        avoide leadership advice
-        """
-    elif context.experience_level == "mid-level":
-        return f"""{memory_context}You are a linkedin guru. Be concise and give professional response to the user
-        Optimizing or generating content asked in the query of the user
-        {user_input}
-        to the following LinkedIn profile's to match a mid-level level experience in the {context.industry} industry.
-        
-        PROFILE DATA:
-        {st.session_state.profile_data}
-
-        Following are the industry based context: {industry_based_context()}
-        
-        1. The asked section should be rewritten and optimized according to the years of experience {context.total_work_experience} and recently working in role {context.role_type} as {context.recent_career_type}.
-        2. Use technical language.
-        3. Include growth and leadership qualities.
-        4. Help user Optimize the section asked by the user to increase its future hiring chances and expand its reach.
-        5. Include the Options or examples in markdown format that is easy to copy and paste.
-        6. Improve profile completeness from {context.profile_completeness}.
-        """
-    elif context.experience_level == "senior":
-        return f"""{memory_context}You are a linkedin guru. Be concise and give professional and specialised response to the user
-        Optimizing or generating content asked in the query of the user
-        {user_input}
-        to the following LinkedIn profile's to match a senior level experience in the {context.industry} industry.
-        
-        PROFILE DATA:
-        {st.session_state.profile_data}
-
-        Following are the industry based context: {industry_based_context()}
-        
-        1. The asked section should be rewritten and optimized according to the years of experience {context.total_work_experience} and recently working in role {context.role_type} as {context.recent_career_type}.
-        2. Use technical language.
-        3. Include leadership and growth strategies if needed.
-        4. Help user Optimize the section asked by the user to increase its reach and audience.
-        5. Include the Options or examples in markdown format that is easy to copy and paste.
-        6. Improve profile completeness from {context.profile_completeness}.
-        """
-#analysing the profile
-def profile_analysis(context, user_input):
-    memory_context = get_conversation_memory()
-    
-    if context.experience_level == "junior":
-        return f"""{memory_context}You are a LinkedIn profile analysis expert. Be encouraging and provide friendly, supportive guidance for a junior professional.
-
-        USER QUERY: {user_input}
-        
-        PROFILE DATA:
-        {st.session_state.profile_data}
-
-        CONTEXT:
-        - Experience Level: {context.experience_level}
-        - Industry: {context.industry}
-        - Career Stage: {context.career_stage}
-        - Recent Career Type: {context.recent_career_type}
-        - Total Work Experience: {context.total_work_experience} years
-        - Current Role: {context.role_type}
-        - Profile Completeness: {context.profile_completeness}%
-
-        Industry Context: {industry_based_context()}
-
-        As a junior professional, focus your analysis on:
-
-        1. **Profile Foundation Assessment**:
-           - About Section: Is it clear, enthusiastic, and shows potential?
-           - Experience Section: Are internships, projects, and part-time work well-described?
-           - Skills Section: Balance of technical and soft skills for entry-level roles
-           - Education Section: Academic projects, coursework, and achievements
-           - Certifications: Entry-level certifications and online courses
-
-        2. **Entry-Level Optimization**:
-           - Highlighting transferable skills from education and internships
-           - Showcasing personal projects and volunteer work
-           - Demonstrating eagerness to learn and grow
-           - Missing foundational skills for {context.industry}
-
-        3. **Profile Building Strategy**:
-           - Current completeness score: {context.profile_completeness}%
-           - Quick wins to improve profile visibility
-           - Essential sections to complete first
-           - How to make the most of limited experience
-
-        4. **Junior-Level Best Practices**:
-           - How to stand out as a new graduate/junior professional
-           - Keywords that recruiters look for in junior candidates
-           - Building credibility with limited experience
-           - Networking strategies for career starters
-
-        5. **Growth-Focused Action Plan**:
-           - Immediate steps to strengthen profile
-           - Skills to develop and showcase
-           - How to gain relevant experience
-           - Building a professional network
-
-        Use simple language, provide step-by-step guidance, and focus on building confidence. Format in markdown with clear sections.
-        """
-    
-    elif context.experience_level == "mid-level":
-        return f"""{memory_context}You are a LinkedIn profile analysis expert. Provide professional and strategic guidance for a mid-level professional.
-
-        USER QUERY: {user_input}
-        
-        PROFILE DATA:
-        {st.session_state.profile_data}
-
-        CONTEXT:
-        - Experience Level: {context.experience_level}
-        - Industry: {context.industry}
-        - Career Stage: {context.career_stage}
-        - Recent Career Type: {context.recent_career_type}
-        - Total Work Experience: {context.total_work_experience} years
-        - Current Role: {context.role_type}
-        - Profile Completeness: {context.profile_completeness}%
-
-        Industry Context: {industry_based_context()}
-
-        As a mid-level professional, focus your analysis on:
-
-        1. **Professional Growth Assessment**:
-           - About Section: Does it reflect career progression and future aspirations?
-           - Experience Section: Are achievements quantified and impact clearly shown?
-           - Skills Section: Advanced technical skills and emerging leadership abilities
-           - Education Section: Continued learning and professional development
-           - Certifications: Industry-relevant and advanced certifications
-
-        2. **Career Advancement Optimization**:
-           - Demonstrating progression from junior to mid-level responsibilities
-           - Leadership experience and team collaboration
-           - Strategic thinking and problem-solving capabilities
-           - Industry expertise and specialized knowledge gaps
-
-        3. **Competitive Positioning**:
-           - Current completeness score: {context.profile_completeness}%
-           - How to stand out among other mid-level professionals
-           - Thought leadership opportunities
-           - Building authority in {context.industry}
-
-        4. **Mid-Level Professional Standards**:
-           - Industry benchmarks for {context.total_work_experience} years of experience
-           - Advanced keywords and technical terminology
-           - Networking for career advancement
-           - Building a professional brand
-
-        5. **Strategic Career Development**:
-           - Preparing for senior-level transitions
-           - Skill gaps for next career level
-           - Leadership development opportunities
-           - Industry trend alignment
-
-        Use professional language, focus on strategic career moves, and emphasize growth potential. Format in markdown with clear sections and be dynamic to the user query.
-        """
-    
-    elif context.experience_level == "senior":
-        return f"""{memory_context}You are a LinkedIn profile analysis expert. Provide sophisticated and strategic guidance for a senior professional.
-
-        USER QUERY: {user_input}
-        
-        PROFILE DATA:
-        {st.session_state.profile_data}
-
-        CONTEXT:
-        - Experience Level: {context.experience_level}
-        - Industry: {context.industry}
-        - Career Stage: {context.career_stage}
-        - Recent Career Type: {context.recent_career_type}
-        - Total Work Experience: {context.total_work_experience} years
-        - Current Role: {context.role_type}
-        - Profile Completeness: {context.profile_completeness}%
-
-        Industry Context: {industry_based_context()}
-
-        As a senior professional, focus your analysis on:
-
-        1. **Executive Presence Assessment**:
-           - About Section: Does it convey thought leadership and strategic vision?
-           - Experience Section: Are major achievements and business impact highlighted?
-           - Skills Section: Leadership competencies and industry expertise
-           - Education Section: Executive education and board positions
-           - Certifications: Executive-level credentials and thought leadership
-
-        2. **Leadership and Impact Optimization**:
-           - Demonstrating organizational influence and strategic decision-making
-           - Mentorship and team development capabilities
-           - Industry contributions and innovation leadership
-           - Business transformation and growth initiatives
-
-        3. **Executive-Level Positioning**:
-           - Current completeness score: {context.profile_completeness}%
-           - Thought leadership and industry recognition
-           - Speaking engagements and publications
-           - Board positions and advisory roles
-
-        4. **Senior Professional Standards**:
-           - C-suite and executive-level expectations
-           - Industry thought leadership opportunities
-           - Strategic networking and relationship building
-           - Personal brand as an industry expert
-
-        5. **Legacy and Succession Planning**:
-           - Knowledge transfer and mentorship opportunities
-           - Industry contributions and lasting impact
-           - Succession planning and talent development
-           - Future-proofing career trajectory
-
-        Use sophisticated language, focus on strategic leadership, and emphasize industry influence. Format in markdown with clear sections dinamically chosen as per user query.
-        """
-#Job fit score to the given job titles
-def job_fit_analysis(context, user_input):
-    memory_context = get_conversation_memory()
-    
-    return f"""{memory_context}You are a job fit analysis expert. Analyze how well the LinkedIn profile matches the target job role{st.session_state.job_titles}. Be Short and concise in answering.
-
-    USER QUERY (including target job role): {user_input}
-    
-    PROFILE DATA:
-    {st.session_state.profile_data}
-
-    CONTEXT:
-    - Experience Level: {context.experience_level}
-    - Industry: {context.industry}
-    - Career Stage: {context.career_stage}
-    - Recent Career Type: {context.recent_career_type}
-    - Total Work Experience: {context.total_work_experience} years
-    - Current Role: {context.role_type}
-    - Profile Completeness: {context.profile_completeness}%
-
-    Industry Context: {industry_based_context()}
-
-    Please provide a comprehensive job fit analysis:
-
-    
-
-    1. **Match Score Analysis**:
-       - **Overall match score (0-100%)** in Large text.
-       - Skills match score
-       - Experience match score
-       - Education/certification match score
-       - Industry experience match score
-    2. **Job Role Understanding**:
-       - Extract the target job role from the user query
-       - Create a standard job description for this role in the {context.industry} industry
-       - List key requirements, skills, and qualifications typically needed
-
-    3. **Strengths Alignment**:
-       - Profile elements that strongly match the job requirements
-       - Relevant experience and achievements
-       - Transferable skills that add value
-
-    4. **Gap Analysis**:
-       - Missing skills or qualifications
-       - Experience gaps
-       - Certification or education requirements not met
-       - Industry-specific knowledge gaps
-
-    5. **Improvement Recommendations**:
-       - Immediate actions to improve match score
-       - Skills to develop or highlight
-       - Experience to emphasize or reframe
-       - Keywords to add for ATS optimization
-       - Sections to update or strengthen
-
-    6. **Application Strategy**:
-       - How to position the profile for this role
-       - Cover letter key points
-       - Interview preparation focus areas
-       - Network targeting suggestions
-    choose the answer structure dinamically according to user query.
-    Format the response in markdown with clear sections, match scores, and actionable recommendations.
-    """
-
-def career_counseling_skill_gap_analysis(context, user_input):
-    memory_context = get_conversation_memory()
-    
-    return f"""{memory_context}You are a career counseling expert specializing in skill gap analysis and career development,be short and concise in answering .
-
-    USER QUERY: {user_input}
-    TARGATING ROLS {st.session_state.job_titles}
-    PROFILE DATA:
-    {st.session_state.profile_data}
-
-    CONTEXT:
-    - Experience Level: {context.experience_level}
-    - Industry: {context.industry}
-    - Career Stage: {context.career_stage}
-    - Recent Career Type: {context.recent_career_type}
-    - Total Work Experience: {context.total_work_experience} years
-    - Current Role: {context.role_type}
-    - Profile Completeness: {context.profile_completeness}%
-
-    Industry Context: {industry_based_context()}
-
-    Please provide comprehensive career counseling and skill gap analysis based on the following structure which can be dimamically modified as per user need:
-
-    1. **Current Skills Assessment**:
-       - Technical skills inventory
-       - Soft skills evaluation
-       - Industry-specific competencies
-       - Leadership and management capabilities
-       - Certification and qualification status
-
-    2. **Career Path Analysis**:
-       - Potential career trajectories based on current profile
-       - Natural progression opportunities in {context.industry}
-       - Lateral movement possibilities
-       - Industry transition opportunities
-
-    3. **Target Role Requirements**:
-       - Skills needed for desired career progression
-       - Industry standards for next-level positions
-       - Emerging skills in {context.industry}
-       - Future-proof skills for career longevity
-
-    4. **Skill Gap Identification**:
-       - Critical missing skills for career advancement
-       - Nice-to-have skills for competitive advantage
-       - Outdated skills that need updating
-       - Soft skills development needs
+if 'job_titles' not in st.session_state:
+    st.session_state.job_titles = []
+if 'priority' not in st.session_state:
+    st.session_state.priority = "interactive"
+if 'conversation_memory' not in st.session_state:
+    st.session_state.conversation_memory = new_conversation_memory(st.session_state.priority)
+if 'prefetcher' not in st.session_state:
+    st.session_state.prefetcher = None
+if 'changed_sections' not in st.session_state:
+    st.session_state.changed_sections = None
+if 'response_key' not in st.session_state:
+    st.session_state.response_key = None
+if 'history_pages' not in st.session_state:
+    st.session_state.history_pages = 1
+if 'rendered_upto' not in st.session_state:
+    st.session_state.rendered_upto = 0
+if 'earlier_messages' not in st.session_state:
+    st.session_state.earlier_messages = []
+
+# messages per history page; older pages are only rendered on request
+CHAT_PAGE_SIZE = get_setting("CHAT_PAGE_SIZE", 20, int)
+# with a session store, the oldest messages beyond this many are dropped from memory and read back on request
+CHAT_MAX_LOADED = get_setting("CHAT_MAX_LOADED", 100, int)
+# ...and the history view holds at most this many pages, sliding back through older ones as the user scrolls
+MAX_HISTORY_PAGES = max(1, CHAT_MAX_LOADED // CHAT_PAGE_SIZE)
+
+# Restore a stored session; its id in the URL lets a reload or reconnect pick it up again
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = None
+    if session_store is not None:
+        session_id = st.query_params.get("session") or uuid.uuid4().hex
+        st.query_params["session"] = session_id
+        st.session_state.session_id = session_id
+        snapshot = session_store.load_state(session_id)
+        if snapshot:
+            restore_session(st.session_state, snapshot)
+        # only the latest page is loaded; the conversation memory starts from it
+        st.session_state.chat_history = session_store.load_messages(session_id, limit=CHAT_PAGE_SIZE)
+
+def add_message(message):
+    """Appends a message to the chat history and, when enabled, the session store."""
+    if session_store is not None:
+        message["seq"] = session_store.append_message(st.session_state.session_id, message)
+    st.session_state.chat_history.append(message)
+
+def save_session():
+    if session_store is not None:
+        session_store.save_state(st.session_state.session_id, session_snapshot(st.session_state))
+
+def stream_response(user_input, intent_function=None, standalone=False):
+    """Streams the answer into the current chat message and returns the final text."""
+    with st.spinner("Let me think..."):
+        chunks = process_user_query(st.session_state, user_input, intent_function, stream=True, standalone=standalone)
+        # wait for the first tokens under the spinner, then let the rest stream in
+        first_chunk = next(chunks, "")
+    with metrics.span("render", stream=True):
+        return st.write_stream(itertools.chain([first_chunk], chunks))
+
+def render_markdown(text):
+    with metrics.span("render"):
+        st.markdown(text)
+
+def debug_panel():
+    """Per-stage timings, counters and recent spans, with JSONL and Prometheus downloads."""
+    with st.expander("🛠 Debug metrics", expanded=True):
+        stages = metrics.stage_stats()
+        if stages:
+            st.dataframe([{"stage": stage, "count": stats["count"], "errors": stats["errors"], "p50 (s)": round(stats["p50"], 3),
+                           "p95 (s)": round(stats["p95"], 3), "max (s)": round(stats["max"], 3)} for stage, stats in stages.items()],
+                         hide_index=True)
+        counters = metrics.counters()
+        for (name, labels), value in sorted(counters.items()):
+            st.caption(f"{name} " + " ".join(f"{label}={label_value}" for label, label_value in labels) + f": {value:g}")
+        st.json(metrics.events(limit=20), expanded=False)
+        st.download_button("Download spans (JSONL)", metrics.to_jsonl(), file_name="metrics.jsonl", mime="application/jsonl")
+        st.download_button("Download metrics (Prometheus)", metrics.to_prometheus(), file_name="metrics.prom", mime="text/plain")
+
+def render_message(i, messages):
+    message = messages[i]
+    with st.chat_message(message["role"]):
+        st.markdown(message["content"])
+        # answers may come from the response cache, so let the user ask for a fresh one
+        if "query" in message and st.button("🔄 Regenerate", key=f"regenerate_{message.get('seq', i)}"):
+            with st.spinner("Regenerating..."):
+                # a chat answer is regenerated with the conversation up to its question and replaces its cached answer
+                response = process_user_query(st.session_state, message["query"], message["intent_function"], standalone=message["standalone"], regenerate=True,
+                                              history=None if message["standalone"] else messages[:i], cache_key=message.get("cache_key"))
+            if response:
+                message["content"] = response
+                if session_store is not None:
+                    session_store.update_message(st.session_state.session_id, message["seq"], message)
+            st.rerun()
 
-    5. **Learning and Development Plan**:
-       - Priority skills to develop first
-       - Recommended learning resources (courses, certifications, books)
-       - Timeline for skill development
-       - Budget considerations for training
+def show_earlier_messages():
+    st.session_state.history_pages += 1
 
-    6. **Career Development Strategy**:
-       - Short-term goals (3-6 months)
-       - Medium-term objectives (6-18 months)
-       - Long-term career vision (2-5 years)
-       - Networking and mentorship recommendations
+def show_later_messages():
+    st.session_state.history_pages -= 1
 
-    7. **Action Plan**:
-       - Immediate steps to take
-       - Milestone tracking suggestions
-       - Progress measurement methods
-       - Regular review and adjustment schedule
+def trim_history():
+    """Keeps at most CHAT_MAX_LOADED messages in the live history when they are also in the session store.
 
-    Format the response in markdown with clear sections, timelines, and specific resource recommendations.
+    The dropped messages are folded into the conversation memory's summary;
+    the history view reuses them rather than reading them back.
     """
-#Fallback handler
-def general_prompt_handler(context, user_input):
-    memory_context = get_conversation_memory()
-    
-    return f"""{memory_context}only solve the query 
-    {user_input} in short and concise manner and as
-    you are a linkedin expert only encorage the user to ask more questions and provide helpful insights like profile enhancement and job fit analysis in short for the profile{st.session_state.profile_data}.
+    if session_store is None:
+        return
+    dropped = trim_loaded(st.session_state.chat_history, st.session_state.conversation_memory, CHAT_MAX_LOADED, CHAT_PAGE_SIZE)
+    earlier = st.session_state.earlier_messages
+    if dropped:
+        st.session_state.earlier_messages = earlier + dropped if earlier and earlier[-1]["seq"] + 1 == dropped[0]["seq"] else dropped
+
+def history_window():
+    """(messages, position of the first one in view, messages hidden before the view, hidden after it).
+
+    With a session store the view spans at most MAX_HISTORY_PAGES pages: paging
+    back drops its newest page from memory and reads an older one from the
+    store, and paging forward reads it back.
     """
-#Routing agent 
-def classify_user_intent(user_input):
-    classification_prompt = f"""
-    Classify this query into one category:
-    1. "content_rewrite" - optimize/rewrite LinkedIn sections/generate content/change content etc.
-    2. "profile_analysis" - analyze profile gaps/evaluation/tell me about my profile/how is my profile etc.
-    3. "job_fit_analysis" - analyze job role fit/what are my chances for this job/how do I fit for this role etc.
-    4. "career_counseling" - career advice/skill gaps/how to advance my career/help in carrer progression etc.
-    5. "general" - other questions if not fitting into above categories.
-    
-    Query: "{user_input}"
-    
-    Respond with only the category name.
+    history = st.session_state.chat_history
+    pages = st.session_state.history_pages
+    if session_store is None:
+        start = max(0, len(history) - CHAT_PAGE_SIZE * pages)
+        return history, start, start, 0
+    trim_history()
+    total = history[-1]["seq"] + 1 if history else 0
+    start, end = history_view(total, pages, CHAT_PAGE_SIZE, MAX_HISTORY_PAGES)
+    first_live = history[0]["seq"] if history else total
+    earlier = load_window(session_store, st.session_state.session_id, st.session_state.earlier_messages, start, min(end, first_live))
+    st.session_state.earlier_messages = earlier
+    return earlier + history[max(0, start - first_live):max(0, end - first_live)], 0, start, total - end
+
+def render_history():
+    """Renders the latest CHAT_PAGE_SIZE messages per requested page, so render time does not grow with the conversation."""
+    messages, first, hidden_before, hidden_after = history_window()
+    if hidden_before:
+        st.button(f"⬆️ Show earlier messages ({hidden_before} hidden)", on_click=show_earlier_messages)
+    with metrics.span("render", messages=len(messages) - first):
+        for i in range(first, len(messages)):
+            render_message(i, messages)
+    if hidden_after:
+        st.button(f"⬇️ Show later messages ({hidden_after} hidden)", on_click=show_later_messages)
+    mark_rendered()
+
+def mark_rendered():
+    """Records that every message so far is on the page outside the chat panel."""
+    st.session_state.rendered_upto = len(st.session_state.chat_history)
+
+@st.fragment
+def chat_panel():
+    """Chat input plus the messages sent through it since the last full run.
+
+    Sending a message only reruns this fragment, so the sidebar and the
+    history above are not rebuilt for every turn.
     """
-
-    try:
-        response = client.models.generate_content(model='gemini-2.0-flash', contents=classification_prompt)
-        intent = response.text.strip().lower()
-        
-        intent_mapping = {
-            "content_rewrite": "content_rewrite_or_generation",
-            "profile_analysis": "profile_analysis",
-            "job_fit_analysis": "job_fit_analysis",
-            "career_counseling": "career_counseling_skill_gap_analysis",
-            "general": "general_prompt_handler"
-        }
-        
-        return intent_mapping.get(intent, "general_prompt_handler")
-    except Exception as e:
-        st.error(f"Error in intent classification: {e}")
-        return "general_prompt_handler"
-
-def process_user_query(user_input):
-    if not st.session_state.profile_context:
-        return "Please provide a LinkedIn URL first to analyze your profile."
+    history = st.session_state.chat_history
+    for i in range(st.session_state.rendered_upto, len(history)):
+        render_message(i, history)
     
-    context = st.session_state.profile_context
-    intent_function = classify_user_intent(user_input)
-    
-    function_mapping = {
-        "content_rewrite_or_generation": content_rewrite_or_generation,
-        "profile_analysis": profile_analysis,
-        "job_fit_analysis": job_fit_analysis,
-        "career_counseling_skill_gap_analysis": career_counseling_skill_gap_analysis,
-        "general_prompt_handler": general_prompt_handler
-    }
-    
-    handler_function = function_mapping.get(intent_function, general_prompt_handler)
-    prompt = handler_function(context, user_input)
+    # Chat input
+    if prompt := st.chat_input("Ask me anything about your LinkedIn profile or career..."):
+        # Add user message to chat
+        add_message({"role": "user", "content": prompt})
+        # Generate and add assistant response
+        with st.chat_message("user"):
+                st.markdown(prompt)
+        with st.chat_message("assistant"):
+            response = stream_response(prompt)
+            if response:
+                add_message({"role": "assistant", "content": response, "query": prompt, "intent_function": None,
+                             "standalone": False, "cache_key": st.session_state.response_key})
+        # once the panel holds a page of its own, fold it into the paged history
+        if len(history) - st.session_state.rendered_upto > CHAT_PAGE_SIZE:
+            st.rerun()
     
-    try:
-        response = client.models.generate_content(model='gemini-2.0-flash', contents=prompt)
-        return response.text.strip()
-    except Exception as e:
-        st.error(f"Error generating response: {e}")
-        return None
+    # Clear chat button
+    if history and st.button("🗑️ Clear Chat"):
+        st.session_state.chat_history = []
+        st.session_state.conversation_memory.reset()
+        st.session_state.earlier_messages = []
+        st.session_state.history_pages = 1
+        if session_store is not None:
+            session_store.clear_messages(st.session_state.session_id)
+        st.rerun()
 
 # Streamlit App
 def main():
@@ -533,31 +238,54 @@ def main():
             help="Enter job titles you're interested in (one per line)"
         )
         
+        force_refresh = st.checkbox(
+            "Force refresh",
+            help="Scrape the profile again even if a cached copy exists"
+        )
+        
         # Process profile button
         if st.button("🔍 Analyze Profile", type="primary"):
             if linkedin_url:
+                # answers prefetched for the previous profile are no longer wanted
+                cancel_prefetch(st.session_state)
                 with st.spinner("Analyzing LinkedIn profile..."):
+                    # clicking Cancel reruns the script, which stops polling and aborts the actor run
+                    st.button("✖ Cancel", key="cancel_scrape")
+                    scrape_status = st.empty()
+                    def show_scrape_status(status, message):
+                        scrape_status.caption(f"Scraper: {status.lower()}" + (f" — {message}" if message else ""))
                     try:
-                        profile_data = get_profile(linkedin_url)
-                        if profile_data:
-                            st.session_state.profile_data = profile_data
-                            context = get_profile_context(profile_data)
-                            if context:
-                                st.session_state.profile_context = context
+                        profile_item, profile_data = get_profile_item(linkedin_url, force_refresh=force_refresh, on_status=show_scrape_status)
+                        scrape_status.empty()
+                        if profile_item:
+                            titles = [title.strip() for title in job_titles.split('\n') if title.strip()]
+                            if analyze_profile(st.session_state, profile_item, profile_data, titles):
+                                save_session()
+                                start_prefetch(st.session_state)
                                 st.success("✅ Profile analyzed successfully!")
-                                
-                                # Store job titles in session state
-                                if job_titles:
-                                    st.session_state.job_titles = [title.strip() for title in job_titles.split('\n') if title.strip()]
-                                else:
-                                    st.error("Failed to analyze profile context")
+                                changed = st.session_state.changed_sections
+                                if changed is not None:
+                                    st.caption("Changed since the last analysis: " + (", ".join(section for section in SECTIONS if section in changed) or "nothing"))
+                            else:
+                                st.error("Failed to analyze profile context")
                         else:
-                            st.error(" Failed to scrape profile data")
+                            st.error(f" Failed to scrape profile data: {profile_data}")
                     except Exception as e:
                         st.error(f" Error: {e}")
             else:
                 st.warning("⚠️ Please enter a LinkedIn URL")
         
+        cache_stats = profile_cache.stats()
+        st.caption(f"Profile cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['size']} stored)")
+        cache_stats = response_cache.stats()
+        st.caption(f"Response cache: {cache_stats['hit_rate']:.0%} hit rate ({cache_stats['hits']} hits / {cache_stats['misses']} misses)")
+        queue_stats = scheduler.stats()
+        st.caption(f"Gemini queue: {queue_stats['queue_depth']} waiting, {queue_stats['in_flight']} in flight, p95 wait {queue_stats['p95_wait']:.1f}s")
+        for model, usage in model_usage.stats().items():
+            st.caption(f"{model}: {usage['calls']} calls, {usage['avg_latency']:.1f}s avg, {usage['input_tokens'] + usage['output_tokens']} tokens" + (f", {usage['escalations']} escalated" if usage['escalations'] else ""))
+        if st.checkbox("Show debug metrics", value=get_setting("DEBUG_PANEL", False, bool)):
+            debug_panel()
+        
         # Display stored job titles
         if 'job_titles' in st.session_state and st.session_state.job_titles:
             st.subheader("Target Roles")
@@ -578,24 +306,17 @@ def main():
                                         st.metric("Profile Completeness", f"{st.session_state.profile_context.profile_completeness}%")
     
             st.subheader(" Quick Actions")
-            col1, col2 = st.columns(2)
-            with col1:
-                if st.button("Analyze Profile",use_container_width = True):
-                    st.session_state.quick_query = "Analyze my LinkedIn profile and identify key gaps and improvement areas"
-                if st.button("Improve About Section",use_container_width = True):
-                    st.session_state.quick_query = "Rewrite and optimize my About section"
-                if st.button("Improve Headline",use_container_width = True):
-                    st.session_state.quick_query = "Rewrite and optimize my LinkedIn headline"
-            with col2:
-                if st.button("Optimize Skills",use_container_width = True):
-                    st.session_state.quick_query = "Optimize my skills section for better visibility"
-                if st.button("Job Fit Analysis",use_container_width = True):
-                    if 'job_titles' in st.session_state and st.session_state.job_titles:
-                        st.session_state.quick_query = f"Analyze my fit for {st.session_state.job_titles[0]} role"
-                    else:
-                        st.session_state.quick_query = "Analyze my profile for job opportunities"
-                if st.button("Skill Gap Analysis",use_container_width = True):
-                   st.session_state.quick_query = "What skills do I need to develop for career advancement?"
+            actions = quick_actions(st.session_state)
+            columns = st.columns(2)
+            for i, (label, query, intent_function) in enumerate(actions):
+                with columns[i * 2 // len(actions)]:
+                    if st.button(label,use_container_width = True):
+                        st.session_state.quick_query = query
+                        st.session_state.quick_intent = intent_function
+            if st.session_state.job_titles and st.button("Rank All Target Roles",use_container_width = True):
+                st.session_state.rank_job_titles = True
+            if st.session_state.profile is not None and st.button("Suggest Roles I Fit",use_container_width = True):
+                st.session_state.suggest_roles = True
     st.sidebar.markdown("---")               
     st.sidebar.markdown("### 🧪Use Your Profile Or One Of the Example LinkedIn Profiles for Testing")
     st.sidebar.markdown("Use these public profiles to test application's analysis capabilities.")
@@ -627,49 +348,59 @@ def main():
     # Main chat interface
     st.subheader("Chat with LinkedIn Expert")
     
-    # Display chat history
-    chat_container = st.container()
-    with chat_container:
-        for message in st.session_state.chat_history:
-            with st.chat_message(message["role"]):
-                st.markdown(message["content"])
+    # Display the latest pages of the chat history
+    render_history()
     
     # Handle quick query
     if 'quick_query' in st.session_state:
         query = st.session_state.quick_query
+        intent_function = st.session_state.pop("quick_intent", None)
         del st.session_state.quick_query
         
         # Add user message to chat
-        st.session_state.chat_history.append({"role": "user", "content": query})
+        add_message({"role": "user", "content": query})
         
         # Generate and add assistant response
-        with st.spinner("Thinking..."):
-            response = process_user_query(query)
+        with st.chat_message("user"):
+                st.markdown(query)
+        with st.chat_message("assistant"):
+            with st.spinner("Let me think..."):
+                response = prefetched_answer(st.session_state, query)
             if response:
-                st.session_state.chat_history.append({"role": "assistant", "content": response})
-        
-        st.rerun()
+                render_markdown(response)
+            else:
+                response = stream_response(query, intent_function, standalone=True)
+            if response:
+                add_message({"role": "assistant", "content": response,
+                             "query": query, "intent_function": intent_function, "standalone": True})
+        mark_rendered()
     
-    # Chat input
-    if prompt := st.chat_input("Ask me anything about your LinkedIn profile or career..."):
-        # Add user message to chat
-        st.session_state.chat_history.append({"role": "user", "content": prompt})
-        # Generate and add assistant response
+    # Score every target role in parallel
+    if st.session_state.pop("rank_job_titles", False):
+        query = "Score my fit for all of my target roles"
+        add_message({"role": "user", "content": query})
         with st.chat_message("user"):
-                st.markdown(prompt)
+                st.markdown(query)
         with st.chat_message("assistant"):
-            with st.spinner("Let me think..."):
-                response = process_user_query(prompt)
-                st.markdown(response)
-                if response:
-                    st.session_state.chat_history.append({"role": "assistant", "content": response})
-        
-        st.rerun()
+            with st.spinner(f"Scoring {len(st.session_state.job_titles)} roles..."):
+                response = job_fit_table(score_job_titles(st.session_state, st.session_state.profile_context, st.session_state.job_titles))
+            render_markdown(response)
+            add_message({"role": "assistant", "content": response})
+        mark_rendered()
     
-    # Clear chat button
-    if st.session_state.chat_history and st.button("🗑️ Clear Chat"):
-        st.session_state.chat_history = []
-        st.rerun()
+    # Suggest roles from the local taxonomy, no LLM call
+    if st.session_state.pop("suggest_roles", False):
+        query = "Which roles do I fit best?"
+        add_message({"role": "user", "content": query})
+        with st.chat_message("user"):
+                st.markdown(query)
+        with st.chat_message("assistant"):
+            response = suggested_roles_table(st.session_state.profile)
+            render_markdown(response)
+            add_message({"role": "assistant", "content": response})
+        mark_rendered()
+    
+    chat_panel()
 
 if __name__ == "__main__":
     main()
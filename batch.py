@@ -0,0 +1,200 @@
+#---headless batch analysis
+# Runs the app's pipeline (scrape -> profile context -> handler prompts) for many profiles without Streamlit:
+#
+#     python batch.py profiles.csv results.jsonl --workers 8
+#
+# Profiles are scraped with one actor run per chunk of URLs (scrape.get_profiles), and each profile's LLM
+# stages start on the worker pool as soon as its dataset item arrives.
+#
+# Input rows are CSV columns or JSONL keys: `url`, `job_titles` and `queries`. In CSV, several titles or
+# queries are separated by "|"; in JSONL they may also be lists. Every finished profile is appended to the
+# output as one JSON line, so an interrupted run picks up where it stopped when started again.
+import argparse
+import csv
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import get_setting
+from handlers import JobFitScore, Session, analyze_profile, process_user_query, score_job_titles
+from metrics import metrics
+from model_router import model_usage
+from role_index import RoleMatch
+from scheduler import scheduler
+from scrape import BATCH_CHUNK_SIZE, get_profiles, normalize_linkedin_url
+
+
+def split_field(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.replace("\n", "|").split("|")
+    return [item.strip() for item in value if item and item.strip()]
+
+
+def read_rows(path):
+    """Yields {"url", "job_titles", "queries"} dicts from a CSV or JSONL file."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith((".jsonl", ".json")):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        for row in rows:
+            url = (row.get("url") or row.get("linkedin_url") or "").strip()
+            if url:
+                yield {"url": url, "job_titles": split_field(row.get("job_titles")), "queries": split_field(row.get("queries"))}
+
+
+def completed_urls(path):
+    """Normalized URLs already analyzed without error in an earlier run."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # the last line of a killed run may be cut short
+                continue
+            if not record.get("error"):
+                done.add(normalize_linkedin_url(record["url"]))
+    return done
+
+
+def job_fit_record(job_title, result):
+    if isinstance(result, JobFitScore):
+        return {"job_title": job_title, "source": "llm", **result.model_dump()}
+    if isinstance(result, RoleMatch):
+        return {"job_title": job_title, "source": "local", "match_score": result.score, "missing_skills": result.missing_skills}
+    return {"job_title": job_title, "error": result}
+
+
+class BatchRunner:
+    """Scrapes profiles in chunks and analyzes them on a worker pool.
+
+    Up to `max_scrapes` actor runs of `chunk_size` URLs each are in flight at
+    once. `max_llm_calls` caps how many Gemini steps the workers have in
+    flight, independently of `workers`. Ranking the target roles counts as
+    one step, however many roles it scores.
+    """
+
+    def __init__(self, workers=4, max_scrapes=2, max_llm_calls=4, force_refresh=False, chunk_size=BATCH_CHUNK_SIZE):
+        self.workers = workers
+        self.max_scrapes = max(1, max_scrapes)
+        self.chunk_size = max(1, chunk_size)
+        self.force_refresh = force_refresh
+        self.llm_slots = threading.Semaphore(max(1, max_llm_calls))
+
+    def analyze(self, row, profile_item, profile_data):
+        started = time.monotonic()
+        record = {"url": row["url"]}
+        session = Session(priority="batch")
+        try:
+            with self.llm_slots:
+                analyzed = analyze_profile(session, profile_item, profile_data, row["job_titles"])
+            if not analyzed:
+                record["error"] = "Error: Failed to analyze profile context"
+                return record
+            record["profile_context"] = session.profile_context.model_dump()
+            if session.job_titles:
+                with self.llm_slots:
+                    results = score_job_titles(session, session.profile_context, session.job_titles)
+                record["job_fit"] = [job_fit_record(job_title, result) for job_title, result in results]
+            record["answers"] = []
+            for query in row["queries"]:
+                with self.llm_slots:
+                    response = process_user_query(session, query, standalone=True)
+                record["answers"].append({"query": query, "response": response})
+            # generation errors come back as None; an errored record is retried by the next run
+            unanswered = sum(answer["response"] is None for answer in record["answers"])
+            if unanswered:
+                record["error"] = f"Error: {unanswered} of {len(record['answers'])} queries got no answer"
+        except Exception as e:
+            record["error"] = f"Error: {e}"
+        finally:
+            # the cached prompt prefix is only useful while this profile is being analyzed
+            session.prompt_cache.invalidate()
+            record["elapsed"] = round(time.monotonic() - started, 3)
+        return record
+
+    def scrape_chunk(self, rows, pool, records):
+        """Scrapes one chunk of rows in a single actor run and queues each profile's analysis as it arrives."""
+        remaining = {normalize_linkedin_url(row["url"]): row for row in rows}
+        try:
+            for linkedin_url, profile_item, profile_data in get_profiles([row["url"] for row in rows], self.force_refresh, len(rows)):
+                row = remaining.pop(normalize_linkedin_url(linkedin_url), None)
+                if row is None:
+                    continue
+                if not profile_item:
+                    records.put({"url": row["url"], "error": profile_data})
+                    continue
+                future = pool.submit(self.analyze, row, profile_item, profile_data)
+                future.add_done_callback(lambda future, url=row["url"]: records.put(
+                    future.result() if future.exception() is None else {"url": url, "error": f"Error: {future.exception()}"}))
+            error = "Error: No profile data found"
+        except Exception as e:
+            error = f"Error: {e}"
+        for row in remaining.values():
+            records.put({"url": row["url"], "error": error})
+
+    def run(self, rows, output_path):
+        """Analyzes every row not yet in `output_path`, appending records as they finish; returns (done, failed)."""
+        done = completed_urls(output_path)
+        pending = {}
+        for row in rows:
+            key = normalize_linkedin_url(row["url"])
+            if key not in done and key not in pending:
+                pending[key] = row
+        if done:
+            print(f"Skipping {len(done)} profiles already in {output_path}", file=sys.stderr)
+        rows = list(pending.values())
+        records = queue.Queue()
+        finished = failed = 0
+        with open(output_path, "a", encoding="utf-8") as out, \
+                ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool, \
+                ThreadPoolExecutor(max_workers=self.max_scrapes, thread_name_prefix="scrape") as scrapers:
+            for start in range(0, len(rows), self.chunk_size):
+                scrapers.submit(self.scrape_chunk, rows[start:start + self.chunk_size], pool, records)
+            while finished < len(rows):
+                record = records.get()
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                finished += 1
+                failed += bool(record.get("error"))
+                print(f"[{finished}/{len(rows)}] {record['url']}" + (f" - {record['error']}" if record.get("error") else ""), file=sys.stderr)
+        return finished, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze LinkedIn profiles in bulk without the Streamlit UI.")
+    parser.add_argument("input", help="CSV or JSONL file with url, job_titles and queries")
+    parser.add_argument("output", help="JSONL file results are appended to; existing results are skipped")
+    parser.add_argument("--workers", type=int, default=get_setting("BATCH_WORKERS", 4, int), help="profiles analyzed concurrently")
+    parser.add_argument("--max-scrapes", type=int, default=get_setting("BATCH_MAX_SCRAPES", 2, int), help="concurrent Apify runs")
+    parser.add_argument("--chunk-size", type=int, default=BATCH_CHUNK_SIZE, help="profile URLs scraped per Apify run")
+    parser.add_argument("--max-llm-calls", type=int, default=get_setting("BATCH_MAX_LLM_CALLS", 4, int), help="concurrent Gemini requests")
+    parser.add_argument("--force-refresh", action="store_true", help="scrape profiles again even if cached")
+    parser.add_argument("--metrics", help="write stage timings and counters here at the end: Prometheus text for .prom/.txt, JSON lines otherwise")
+    args = parser.parse_args(argv)
+
+    runner = BatchRunner(args.workers, args.max_scrapes, args.max_llm_calls, args.force_refresh, args.chunk_size)
+    finished, failed = runner.run(read_rows(args.input), args.output)
+    print(f"Analyzed {finished} profiles, {failed} failed", file=sys.stderr)
+    queue_stats = scheduler.stats()
+    print(f"Gemini requests: {queue_stats['completed']}, average queue wait {queue_stats['avg_wait']:.2f}s, p95 {queue_stats['p95_wait']:.2f}s", file=sys.stderr)
+    for model, usage in model_usage.stats().items():
+        print(f"  {model}: {usage['calls']} calls ({usage['errors']} failed, {usage['escalations']} escalated), "
+              f"{usage['avg_latency']:.2f}s average, {usage['input_tokens']} input / {usage['output_tokens']} output tokens", file=sys.stderr)
+    for stage, stats in metrics.stage_stats().items():
+        print(f"  {stage}: {stats['count']} spans, p50 {stats['p50']:.2f}s, p95 {stats['p95']:.2f}s", file=sys.stderr)
+    if args.metrics:
+        metrics.export(args.metrics)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
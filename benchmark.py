@@ -0,0 +1,158 @@
+#---end-to-end latency benchmark
+# Drives the whole pipeline (scrape -> profile context -> intent classification -> handler prompt -> generation)
+# for many synthetic profiles against the offline stand-ins in fakes.py, and reports latency percentiles per
+# stage and end to end, throughput and prompt sizes:
+#
+#     python benchmark.py --profiles 50 --concurrency 8 --gemini-latency 0.4 --failure-rate 0.02
+#
+# Compare the report before and after a change with the same arguments; --output keeps it as JSON.
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import scrape
+from cache import ProfileCache
+from clients import set_backends
+from fakes import FakeApifyClient, FakeGeminiClient
+from handlers import Session, analyze_profile, process_user_query
+from metrics import metrics
+from model_router import model_usage
+from scheduler import scheduler
+
+# one query per handler, so every prompt builder is exercised
+QUERIES = (
+    "Rewrite my LinkedIn headline",
+    "How is my profile? What are the gaps?",
+    "What are my chances for a Data Scientist role?",
+    "Which skills should I learn to advance my career?",
+    "Thanks, that helps",
+)
+
+
+def percentiles(values):
+    values = sorted(values)
+    if not values:
+        return {"count": 0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    return {
+        "count": len(values),
+        "p50": values[int(0.5 * (len(values) - 1))],
+        "p95": values[int(0.95 * (len(values) - 1))],
+        "max": values[-1],
+    }
+
+
+def run_profile(index, queries, stream):
+    """Analyzes one synthetic profile and asks it every query; returns its timings."""
+    started = time.monotonic()
+    session = Session()
+    result = {"profile": index, "turns": [], "error": None}
+    try:
+        profile_item, profile_data = scrape.get_profile_item(f"https://www.linkedin.com/in/benchmark-{index}")
+        if not profile_item:
+            result["error"] = profile_data
+            return result
+        if not analyze_profile(session, profile_item, profile_data, ["Data Scientist", "Product Manager"]):
+            result["error"] = "Error: Failed to analyze profile context"
+            return result
+        result["analyzed"] = time.monotonic() - started
+        for query in queries:
+            turn_started = time.monotonic()
+            response = process_user_query(session, query, stream=stream, standalone=True)
+            first_chunk = None
+            if stream:
+                parts = []
+                for chunk in response:
+                    first_chunk = first_chunk or time.monotonic() - turn_started
+                    parts.append(chunk)
+                response = "".join(parts)
+            result["turns"].append({"latency": time.monotonic() - turn_started, "first_chunk": first_chunk, "ok": bool(response)})
+    except Exception as e:
+        result["error"] = f"Error: {e}"
+    finally:
+        session.prompt_cache.invalidate()
+        result["elapsed"] = time.monotonic() - started
+    return result
+
+
+def run_benchmark(profiles=20, queries=QUERIES, concurrency=4, stream=False):
+    # room for every span of the run, so prompt sizes cover all turns
+    metrics.reset(max_events=profiles * (len(queries) * 4 + 8))
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        results = list(pool.map(lambda index: run_profile(index, queries, stream), range(profiles)))
+    wall_time = time.monotonic() - started
+    turns = [turn for result in results for turn in result["turns"]]
+    prompt_sizes = [event["prompt_tokens"] for event in metrics.events() if event["stage"] == "prompt_build"]
+    return {
+        "profiles": profiles,
+        "failed_profiles": sum(bool(result["error"]) for result in results),
+        "errors": sorted({result["error"] for result in results if result["error"]}),
+        "wall_time": wall_time,
+        "throughput": {"profiles_per_second": profiles / wall_time, "turns_per_second": len(turns) / wall_time},
+        "profile_latency": percentiles([result["elapsed"] for result in results if not result["error"]]),
+        "analyze_latency": percentiles([result["analyzed"] for result in results if "analyzed" in result]),
+        "turn_latency": percentiles([turn["latency"] for turn in turns]),
+        "first_chunk_latency": percentiles([turn["first_chunk"] for turn in turns if turn["first_chunk"] is not None]),
+        "prompt_tokens": percentiles(prompt_sizes),
+        "stages": metrics.stage_stats(),
+        "models": model_usage.stats(),
+        "queue": scheduler.stats(),
+    }
+
+
+def print_report(report, out=sys.stdout):
+    print(f"{report['profiles']} profiles in {report['wall_time']:.1f}s "
+          f"({report['throughput']['profiles_per_second']:.2f} profiles/s, {report['throughput']['turns_per_second']:.2f} turns/s), "
+          f"{report['failed_profiles']} failed", file=out)
+    for error in report["errors"]:
+        print(f"  {error}", file=out)
+    print(f"{'':<22}{'count':>7}{'p50':>10}{'p95':>10}{'max':>10}", file=out)
+    for name in ("profile_latency", "analyze_latency", "turn_latency", "first_chunk_latency"):
+        stats = report[name]
+        print(f"{name:<22}{stats['count']:>7}{stats['p50']:>9.3f}s{stats['p95']:>9.3f}s{stats['max']:>9.3f}s", file=out)
+    for stage, stats in sorted(report["stages"].items()):
+        print(f"{'  ' + stage:<22}{stats['count']:>7}{stats['p50']:>9.3f}s{stats['p95']:>9.3f}s{stats['max']:>9.3f}s", file=out)
+    stats = report["prompt_tokens"]
+    print(f"{'prompt_tokens':<22}{stats['count']:>7}{stats['p50']:>10}{stats['p95']:>10}{stats['max']:>10}", file=out)
+    for model, usage in report["models"].items():
+        print(f"{model}: {usage['calls']} calls ({usage['errors']} failed), {usage['input_tokens']} input / {usage['output_tokens']} output tokens", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline against offline Gemini and Apify stand-ins.")
+    parser.add_argument("--profiles", type=int, default=20, help="synthetic profiles to analyze")
+    parser.add_argument("--queries", type=int, default=len(QUERIES), help=f"queries per profile (up to {len(QUERIES)})")
+    parser.add_argument("--concurrency", type=int, default=4, help="profiles analyzed at once")
+    parser.add_argument("--stream", action="store_true", help="stream answers, as the app does, and measure time to first chunk")
+    parser.add_argument("--apify-delay", type=float, default=1.0, help="seconds an actor run takes")
+    parser.add_argument("--gemini-latency", type=float, default=0.3, help="seconds before a Gemini response starts")
+    parser.add_argument("--tokens-per-second", type=float, default=200, help="Gemini output rate")
+    parser.add_argument("--output-tokens", type=int, default=300, help="tokens in a generated answer")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of Gemini requests that fail with a retryable error")
+    parser.add_argument("--apify-items", help="JSON or JSONL file of recorded dataset items to serve instead of synthetic ones")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    items = []
+    if args.apify_items:
+        with open(args.apify_items, encoding="utf-8") as f:
+            items = json.load(f) if args.apify_items.endswith(".json") else [json.loads(line) for line in f if line.strip()]
+    set_backends(
+        gemini=FakeGeminiClient(args.gemini_latency, args.tokens_per_second, args.failure_rate, output_tokens=args.output_tokens, seed=args.seed),
+        apify=FakeApifyClient(items, delay=args.apify_delay, seed=args.seed),
+    )
+    # every run starts cold and leaves the on-disk profile cache alone
+    scrape.profile_cache = ProfileCache(":memory:")
+
+    report = run_benchmark(args.profiles, QUERIES[:max(0, args.queries)], args.concurrency, args.stream)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["failed_profiles"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+#---caching helpers
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class ProfileCache:
+    """On-disk cache of scraped profiles keyed by normalized LinkedIn URL.
+
+    Each entry keeps the raw Apify dataset item and its rendered summary.
+    Entries older than `ttl` seconds are treated as misses, and once the cache
+    holds more than `max_entries` the least recently used ones are evicted.
+    """
+
+    def __init__(self, path, ttl=24 * 3600, max_entries=500):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS profiles (
+                url TEXT PRIMARY KEY,
+                item TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def get(self, url):
+        """Return (item, summary) for a fresh entry, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT item, summary, created_at FROM profiles WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None or now - row[2] > self.ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM profiles WHERE url = ?", (url,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE profiles SET accessed_at = ? WHERE url = ?", (now, url))
+            self._conn.commit()
+            self.hits += 1
+            return json.loads(row[0]), row[1]
+
+    def put(self, url, item, summary):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO profiles (url, item, summary, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (url, json.dumps(item), summary, now, now),
+            )
+            self._conn.execute(
+                """DELETE FROM profiles WHERE url IN (
+                    SELECT url FROM profiles ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def invalidate(self, url):
+        with self._lock:
+            self._conn.execute("DELETE FROM profiles WHERE url = ?", (url,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM profiles")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self),
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class TTLCache:
+    """Thread-safe in-memory LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, ttl=3600, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[1] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self),
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class SingleFlight:
+    """Collapses concurrent computations of the same key into one.
+
+    The first caller for a key runs the function; callers arriving while it is
+    in flight wait for it and share its result or exception. If the first
+    caller is interrupted (e.g. its Streamlit script is stopped), a waiting
+    caller takes over instead of inheriting the interruption.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function):
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = {"done": threading.Event(), "result": None, "error": None}
+            if leader:
+                break
+            call["done"].wait()
+            if call["error"] is None:
+                return call["result"]
+            if isinstance(call["error"], Exception):
+                raise call["error"]
+        try:
+            call["result"] = function()
+            return call["result"]
+        except BaseException as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
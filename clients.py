@@ -0,0 +1,214 @@
+#---shared API clients
+# One Gemini and one Apify client per process, so every session and worker thread reuses the same
+# connection pools. Gemini calls go through generate_content/generate_content_stream below, which queue
+# each attempt in the request scheduler, give each call a deadline and retry rate-limit and server
+# errors with jittered exponential backoff.
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import httpx
+from apify_client import ApifyClient
+from google import genai
+from google.genai import errors, types
+from config import get_setting
+from memory import estimate_tokens
+from model_router import model_usage
+from scheduler import scheduler
+
+# seconds per HTTP attempt, and for a whole call including its retries
+GEMINI_TIMEOUT = get_setting("GEMINI_TIMEOUT", 60, float)
+GEMINI_DEADLINE = get_setting("GEMINI_DEADLINE", 120, float)
+GEMINI_MAX_RETRIES = get_setting("GEMINI_MAX_RETRIES", 3, int)
+RETRY_BASE_DELAY = get_setting("GEMINI_RETRY_BASE_DELAY", 1.0, float)
+RETRY_MAX_DELAY = get_setting("GEMINI_RETRY_MAX_DELAY", 20.0, float)
+# seconds to wait for a classification before sending a duplicate request; 0 disables hedging
+HEDGE_AFTER = get_setting("GEMINI_HEDGE_AFTER", 0, float)
+APIFY_REQUEST_TIMEOUT = get_setting("APIFY_REQUEST_TIMEOUT", 60, int)
+APIFY_MAX_RETRIES = get_setting("APIFY_MAX_RETRIES", 4, int)
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+# output tokens reserved in the rate limiter for a request without max_output_tokens
+EXPECTED_OUTPUT_TOKENS = get_setting("GEMINI_EXPECTED_OUTPUT_TOKENS", 1000, int)
+# "fake" serves both APIs from the offline stand-ins in fakes.py
+API_BACKEND = get_setting("API_BACKEND", "live")
+
+_lock = threading.Lock()
+_gemini_client = None
+_apify_client = None
+_hedge_pool = ThreadPoolExecutor(max_workers=get_setting("GEMINI_HEDGE_WORKERS", 8, int), thread_name_prefix="gemini-hedge")
+
+
+def get_gemini_client():
+    global _gemini_client
+    with _lock:
+        if _gemini_client is None and API_BACKEND == "fake":
+            from fakes import FakeGeminiClient
+            _gemini_client = FakeGeminiClient.from_settings()
+        if _gemini_client is None:
+            _gemini_client = genai.Client(
+                api_key=get_setting("GOOGLE_API_KEY"),
+                http_options=types.HttpOptions(timeout=int(GEMINI_TIMEOUT * 1000)),
+            )
+        return _gemini_client
+
+
+def get_apify_client():
+    """Apify retries 429 and 5xx responses itself, with exponential backoff."""
+    global _apify_client
+    with _lock:
+        if _apify_client is None and API_BACKEND == "fake":
+            from fakes import FakeApifyClient
+            _apify_client = FakeApifyClient.from_settings()
+        if _apify_client is None:
+            _apify_client = ApifyClient(
+                get_setting("APIFY_API_KEY"),
+                max_retries=APIFY_MAX_RETRIES,
+                timeout_secs=APIFY_REQUEST_TIMEOUT,
+            )
+        return _apify_client
+
+
+def set_backends(gemini=None, apify=None):
+    """Replaces the shared clients, e.g. with the stand-ins from fakes.py; None keeps the current one."""
+    global _gemini_client, _apify_client
+    with _lock:
+        _gemini_client = gemini or _gemini_client
+        _apify_client = apify or _apify_client
+
+
+def is_retryable(error):
+    if isinstance(error, errors.APIError):
+        return error.code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (httpx.TimeoutException, httpx.TransportError, ConnectionError, TimeoutError))
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff, so clients that failed together do not retry together."""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def _with_deadline(config, deadline):
+    """`config` with its HTTP timeout cut to the time left before `deadline`."""
+    remaining = max(1, int((deadline - time.monotonic()) * 1000))
+    http_options = types.HttpOptions(timeout=min(remaining, int(GEMINI_TIMEOUT * 1000)))
+    if config is None:
+        return types.GenerateContentConfig(http_options=http_options)
+    return config.model_copy(update={"http_options": http_options})
+
+
+def request_tokens(contents, config):
+    """Tokens to reserve for a request: its estimated input plus the expected output."""
+    max_output_tokens = getattr(config, "max_output_tokens", None)
+    return estimate_tokens(str(contents)) + (max_output_tokens or EXPECTED_OUTPUT_TOKENS)
+
+
+def used_tokens(response):
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None)
+
+
+def token_counts(response):
+    """(input, output) token counts reported by a response, None where unknown."""
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "prompt_token_count", None), getattr(usage, "candidates_token_count", None)
+
+
+def _retry(attempt_call, timeout):
+    deadline = time.monotonic() + (timeout or GEMINI_DEADLINE)
+    attempt = 0
+    while True:
+        try:
+            return attempt_call(deadline)
+        except Exception as e:
+            delay = backoff_delay(attempt)
+            if attempt >= GEMINI_MAX_RETRIES or not is_retryable(e) or time.monotonic() + delay >= deadline:
+                raise
+            print(f"Gemini call failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+
+def _generate(model, contents, config, timeout, priority):
+    tokens = request_tokens(contents, config)
+
+    def attempt(deadline):
+        with scheduler.slot(tokens, priority, timeout=deadline - time.monotonic()):
+            started = time.monotonic()
+            try:
+                response = get_gemini_client().models.generate_content(
+                    model=model, contents=contents, config=_with_deadline(config, deadline))
+            except Exception:
+                model_usage.record(model, time.monotonic() - started, error=True)
+                raise
+        model_usage.record(model, time.monotonic() - started, *token_counts(response))
+        scheduler.settle(tokens, used_tokens(response))
+        return response
+    return _retry(attempt, timeout)
+
+
+def generate_content(model, contents, config=None, timeout=None, hedge_after=None, priority="interactive"):
+    """client.models.generate_content with a deadline of `timeout` seconds across all retries.
+
+    `priority` is one of scheduler.PRIORITIES. With `hedge_after`, a second
+    identical request is sent if the first has not answered within that many
+    seconds, and whichever succeeds first is used.
+    """
+    if not hedge_after:
+        return _generate(model, contents, config, timeout, priority)
+    futures = {_hedge_pool.submit(_generate, model, contents, config, timeout, priority)}
+    done, _ = wait(futures, timeout=hedge_after)
+    if not done:
+        futures.add(_hedge_pool.submit(_generate, model, contents, config, timeout, priority))
+    error = None
+    while futures:
+        done, futures = wait(futures, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = error or future.exception()
+    raise error
+
+
+def generate_content_stream(model, contents, config=None, timeout=None, priority="interactive"):
+    """Streaming counterpart of generate_content; only retried until the first chunk arrives.
+
+    The request keeps its scheduler slot until the stream is exhausted or closed.
+    """
+    deadline = time.monotonic() + (timeout or GEMINI_DEADLINE)
+    tokens = request_tokens(contents, config)
+
+    started = None
+
+    def start(deadline):
+        nonlocal started
+        scheduler.acquire(tokens, priority, timeout=deadline - time.monotonic())
+        started = time.monotonic()
+        try:
+            stream = iter(get_gemini_client().models.generate_content_stream(
+                model=model, contents=contents, config=_with_deadline(config, deadline)))
+            # errors such as a 429 are raised when the first chunk is requested
+            return stream, next(stream, None)
+        except BaseException:
+            model_usage.record(model, time.monotonic() - started, error=True)
+            scheduler.release()
+            raise
+
+    stream, first_chunk = _retry(start, deadline - time.monotonic())
+    usage = None
+    counts = (None, None)
+    failed = False
+    try:
+        for chunk in itertools.chain([first_chunk] if first_chunk is not None else [], stream):
+            # the last chunk carries the usage of the whole response
+            usage = used_tokens(chunk) or usage
+            if used_tokens(chunk) is not None:
+                counts = token_counts(chunk)
+            yield chunk
+    except Exception:
+        failed = True
+        raise
+    finally:
+        model_usage.record(model, time.monotonic() - started, *counts, error=failed)
+        scheduler.release()
+        scheduler.settle(tokens, usage)
@@ -0,0 +1,23 @@
+#---app settings
+# Values are looked up in environment variables first, then in Streamlit secrets,
+# and fall back to the given default, so the same code runs inside and outside Streamlit.
+import os
+
+
+def _secret(name):
+    try:
+        import streamlit as st
+        return st.secrets.get(name)
+    except Exception:
+        return None
+
+
+def get_setting(name, default=None, cast=None):
+    value = os.environ.get(name)
+    if value is None:
+        value = _secret(name)
+    if value is None:
+        return default
+    if cast is bool and isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return cast(value) if cast else value
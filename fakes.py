@@ -0,0 +1,249 @@
+#---offline stand-ins for the Gemini and Apify clients
+# They implement the parts of genai.Client and ApifyClient this app calls, with configurable latency,
+# token rates and failures, so the pipeline can be run and benchmarked without API keys. Install them
+# with clients.set_backends(...), or set API_BACKEND=fake to have the app and batch.py use them.
+import json
+import random
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+from google.genai import errors, types
+from config import get_setting
+from memory import estimate_tokens
+from role_index import TAXONOMY_PATH
+
+FIRST_NAMES = ("Ada", "Ben", "Chen", "Dara", "Eli", "Fatima", "Goran", "Hana", "Ivan", "Jia", "Kofi", "Lena")
+LAST_NAMES = ("Okafor", "Smith", "Tanaka", "Garcia", "Novak", "Patel", "Silva", "Kim", "Haddad", "Berg")
+COMPANIES = ("Acme", "Globex", "Initech", "Umbrella", "Stark Industries", "Wayne Enterprises", "Hooli", "Vandelay")
+CATEGORIES = ("content_rewrite", "profile_analysis", "job_fit_analysis", "career_counseling", "general")
+FILLER = ("Highlight", "measurable", "impact", "in", "your", "headline", "and", "about", "section,", "add", "the",
+          "skills", "recruiters", "search", "for,", "and", "show", "leadership", "with", "concrete", "results.")
+
+
+def _taxonomy_roles():
+    with open(TAXONOMY_PATH, encoding="utf-8") as f:
+        taxonomy = json.load(f)
+    return [(industry, title, skills) for industry, roles in taxonomy.items() for title, skills in roles.items()]
+
+
+def synthetic_profile(index, url=None):
+    """A deterministic Apify dataset item for a made-up profile, built from a taxonomy role."""
+    rng = random.Random(index)
+    roles = _taxonomy_roles()
+    industry, title, skills = roles[index % len(roles)]
+    years = rng.randint(1, 25)
+    seniority = "Senior " if years >= 8 else ""
+    start_year = 2025 - years
+    experiences = []
+    for position in range(rng.randint(1, 4)):
+        end_year = 2025 - position * 3
+        if position and end_year <= start_year:
+            # short careers have no room for earlier roles
+            break
+        experiences.append({
+            "title": (seniority if position == 0 else "") + title,
+            "subtitle": f"{rng.choice(COMPANIES)} · Full-time",
+            "caption": f"Jan {max(start_year, end_year - 3)} - {'Present' if position == 0 else end_year}",
+        })
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    slug = name.lower().replace(" ", "-") + f"-{index}"
+    return {
+        "linkedinUrl": url or f"https://www.linkedin.com/in/{slug}",
+        "fullName": name,
+        "headline": f"{seniority}{title} in {industry}",
+        "about": " ".join(rng.choice(FILLER) for _ in range(rng.randint(20, 120))),
+        "connections": rng.randint(50, 500),
+        "followers": rng.randint(50, 5000),
+        "addressCountryOnly": rng.choice(("United States", "India", "Germany", "Brazil", "Kenya")),
+        "skills": rng.sample(skills, k=min(len(skills), rng.randint(3, 12))),
+        "experiences": experiences,
+        "educations": [{"title": "State University", "caption": f"{start_year - 4} - {start_year}"}],
+    }
+
+
+def _url_key(url):
+    return url.strip().lower().rstrip("/").split("://")[-1].replace("www.", "")
+
+
+class FakeApifyClient:
+    """Serves recorded dataset items, or synthetic ones for unknown URLs, `delay` seconds after a run starts.
+
+    A run's items are written one by one across the delay, like a real actor run.
+    """
+
+    def __init__(self, items=(), delay=2.0, failure_rate=0.0, seed=None):
+        self.items = {_url_key(item.get("linkedinUrl") or item.get("url") or ""): item for item in items}
+        self.delay = delay
+        self.failure_rate = failure_rate
+        self.runs = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        items = []
+        path = get_setting("FAKE_APIFY_ITEMS")
+        if path:
+            with open(path, encoding="utf-8") as f:
+                items = json.load(f) if path.endswith(".json") else [json.loads(line) for line in f if line.strip()]
+        return cls(items, delay=get_setting("FAKE_APIFY_DELAY", 2.0, float), failure_rate=get_setting("FAKE_APIFY_FAILURE_RATE", 0.0, float))
+
+    def _item(self, url):
+        item = self.items.get(_url_key(url))
+        if item is None:
+            item = synthetic_profile(sum(map(ord, _url_key(url))), url)
+        return item
+
+    def actor(self, actor_id):
+        return SimpleNamespace(start=self._start)
+
+    def _start(self, run_input, timeout_secs=None, **kwargs):
+        with self._lock:
+            failed = self._random.random() < self.failure_rate
+        run_id = uuid.uuid4().hex
+        self.runs[run_id] = {
+            "id": run_id,
+            "defaultDatasetId": run_id,
+            "started": time.monotonic(),
+            "status": "FAILED" if failed else "SUCCEEDED",
+            "items": [] if failed else [self._item(url) for url in run_input.get("profileUrls", [])],
+            "aborted": False,
+        }
+        return self._run_info(run_id)
+
+    def _run_info(self, run_id):
+        run = self.runs[run_id]
+        if run["aborted"]:
+            status = "ABORTED"
+        elif time.monotonic() - run["started"] < self.delay:
+            status = "RUNNING"
+        else:
+            status = run["status"]
+        return {"id": run_id, "defaultDatasetId": run_id, "status": status, "statusMessage": None}
+
+    def run(self, run_id):
+        def wait_for_finish(wait_secs=None):
+            run = self.runs[run_id]
+            remaining = run["started"] + self.delay - time.monotonic()
+            if remaining > 0 and not run["aborted"]:
+                time.sleep(min(remaining, wait_secs if wait_secs is not None else remaining))
+            return self._run_info(run_id)
+
+        def abort():
+            self.runs[run_id]["aborted"] = True
+
+        return SimpleNamespace(wait_for_finish=wait_for_finish, get=lambda: self._run_info(run_id), abort=abort)
+
+    def dataset(self, dataset_id):
+        def list_items(offset=0, **kwargs):
+            run = self.runs[dataset_id]
+            items = run["items"]
+            elapsed = time.monotonic() - run["started"]
+            written = len(items) if elapsed >= self.delay else int(len(items) * elapsed / self.delay)
+            return SimpleNamespace(items=items[offset:written])
+
+        return SimpleNamespace(list_items=list_items)
+
+
+class _FakeModels:
+    def __init__(self, client):
+        self.client = client
+
+    def generate_content(self, model, contents, config=None):
+        text, input_tokens = self.client.respond(contents, config)
+        output_tokens = estimate_tokens(text)
+        self.client.wait(output_tokens)
+        return self.client.response(text, input_tokens, output_tokens)
+
+    def generate_content_stream(self, model, contents, config=None):
+        text, input_tokens = self.client.respond(contents, config)
+        words = text.split(" ")
+        chunk_words = self.client.chunk_words
+        chunks = [" ".join(words[start:start + chunk_words]) + " " for start in range(0, len(words), chunk_words)]
+        time.sleep(self.client.latency)
+        output_tokens = 0
+        for position, chunk in enumerate(chunks):
+            tokens = estimate_tokens(chunk)
+            output_tokens += tokens
+            time.sleep(tokens / self.client.tokens_per_second)
+            last = position == len(chunks) - 1
+            yield self.client.response(chunk, input_tokens, output_tokens) if last else self.client.response(chunk)
+
+
+class _FakeCaches:
+    def create(self, model, config):
+        return SimpleNamespace(name=f"cachedContents/{uuid.uuid4().hex[:12]}")
+
+    def delete(self, name):
+        pass
+
+
+class FakeGeminiClient:
+    """Answers every prompt with plausible text after `latency` seconds plus the output at `tokens_per_second`.
+
+    A `failure_rate` share of requests fail with `failure_code` before any
+    output, as a rate-limited or overloaded API would.
+    """
+
+    def __init__(self, latency=0.5, tokens_per_second=150, failure_rate=0.0, failure_code=503, output_tokens=400, seed=None):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.failure_rate = failure_rate
+        self.failure_code = failure_code
+        self.output_tokens = output_tokens
+        self.chunk_words = 8
+        self.models = _FakeModels(self)
+        self.caches = _FakeCaches()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            latency=get_setting("FAKE_GEMINI_LATENCY", 0.5, float),
+            tokens_per_second=get_setting("FAKE_GEMINI_TOKENS_PER_SECOND", 150, float),
+            failure_rate=get_setting("FAKE_GEMINI_FAILURE_RATE", 0.0, float),
+            failure_code=get_setting("FAKE_GEMINI_FAILURE_CODE", 503, int),
+            output_tokens=get_setting("FAKE_GEMINI_OUTPUT_TOKENS", 400, int),
+        )
+
+    def wait(self, output_tokens):
+        time.sleep(self.latency + output_tokens / self.tokens_per_second)
+
+    def response(self, text, input_tokens=None, output_tokens=None):
+        usage = None
+        if input_tokens is not None:
+            usage = types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=input_tokens, candidates_token_count=output_tokens, total_token_count=input_tokens + output_tokens)
+        return types.GenerateContentResponse(
+            candidates=[types.Candidate(content=types.Content(role="model", parts=[types.Part(text=text)]))],
+            usage_metadata=usage,
+        )
+
+    def respond(self, contents, config):
+        """(answer text, input tokens) for a prompt, failing like the API would at `failure_rate`."""
+        with self._lock:
+            failed = self._random.random() < self.failure_rate
+            words = [self._random.choice(FILLER) for _ in range(self.output_tokens * 3 // 4)]
+            category = self._random.choice(CATEGORIES)
+        if failed:
+            time.sleep(self.latency)
+            error = errors.ClientError if self.failure_code < 500 else errors.ServerError
+            raise error(self.failure_code, {"error": {"code": self.failure_code, "message": "Simulated failure", "status": "UNAVAILABLE"}})
+        prompt = str(contents)
+        input_tokens = estimate_tokens(prompt)
+        if "match_score" in prompt:
+            return json.dumps({"match_score": len(prompt) % 100, "missing_skills": ["Kubernetes", "Go"], "keywords": ["cloud", "microservices"]}), input_tokens
+        if "JSON format" in prompt:
+            return json.dumps({
+                "experience_level": "mid-level", "industry": "Tech", "career_stage": "mid-career", "recent_career_type": "full-time",
+                "total_work_experience": 6.0, "role_type": "Software Engineer", "profile_completeness": 80,
+            }), input_tokens
+        if "Classify this query" in prompt:
+            return category, input_tokens
+        if "HANDLER:" in prompt:
+            return "HANDLER: general_prompt_handler\n" + " ".join(words), input_tokens
+        if "Update the running summary" in prompt:
+            return " ".join(words[:60]), input_tokens
+        return " ".join(words), input_tokens
@@ -0,0 +1,180 @@
+#---local profile feature extraction
+# Works out the ProfileContext fields that can be read straight from the Apify dataset item,
+# so get_profile_context only has to ask the LLM for the ones that need judgement (e.g. industry).
+import re
+from datetime import date
+
+MONTHS = {m: i for i, m in enumerate(["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], 1)}
+DATE_RANGE = re.compile(
+    r"(?:([A-Za-z]{3})[a-z]*\.?\s+)?(\d{4})\s*[-–—]\s*(?:(present|now|current)|(?:([A-Za-z]{3})[a-z]*\.?\s+)?(\d{4}))",
+    re.IGNORECASE,
+)
+DURATION = re.compile(r"(?:(\d+)\s*yrs?)?\s*(?:(\d+)\s*mos?)?", re.IGNORECASE)
+
+LEADERSHIP_TITLES = ("chief", "ceo", "cto", "cfo", "coo", "president", "vp", "vice president", "director", "head of", "partner")
+FOUNDER_TITLES = ("founder", "co-founder", "cofounder", "owner")
+CONSULTING_TITLES = ("consultant", "advisor", "adviser")
+EMPLOYMENT_TYPES = (
+    ("internship", "internship"),
+    ("apprenticeship", "internship"),
+    ("part-time", "part-time"),
+    ("freelance", "freelance"),
+    ("self-employed", "freelance"),
+    ("contract", "freelance"),
+    ("full-time", "full-time"),
+)
+
+# share of the completeness score contributed by each profile section
+COMPLETENESS_WEIGHTS = {
+    "headline": 10,
+    "about": 15,
+    "experiences": 25,
+    "educations": 15,
+    "skills": 15,
+    "connections": 10,
+    "profilePic": 5,
+    "addressWithCountry": 5,
+}
+
+
+def _month_index(month, year):
+    return int(year) * 12 + MONTHS.get((month or "jan")[:3].lower(), 1) - 1
+
+
+def _parse_range(caption, today):
+    match = DATE_RANGE.search(caption or "")
+    if not match:
+        return None
+    start_month, start_year, present, end_month, end_year = match.groups()
+    start = _month_index(start_month, start_year)
+    if present:
+        end = today.year * 12 + today.month
+    elif end_month:
+        # month ranges are inclusive of the end month
+        end = _month_index(end_month, end_year) + 1
+    else:
+        end = _month_index(None, end_year)
+    return (start, end) if end > start else None
+
+
+def _parse_duration(caption):
+    for match in DURATION.finditer(caption or ""):
+        years, months = match.groups()
+        if years or months:
+            return int(years or 0) * 12 + int(months or 0)
+    return None
+
+
+def total_experience_months(experiences, today=None):
+    """Months of work experience, counting overlapping roles only once."""
+    today = today or date.today()
+    intervals = []
+    unranged = 0
+    for exp in experiences:
+        caption = exp.get("caption") or ""
+        interval = _parse_range(caption, today)
+        if interval:
+            intervals.append(interval)
+            continue
+        months = _parse_duration(caption)
+        if months is None:
+            return None
+        unranged += months
+    if not intervals and not unranged:
+        return None
+    total = unranged
+    current_start = current_end = None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+def profile_completeness(profile):
+    score = 0
+    for section, weight in COMPLETENESS_WEIGHTS.items():
+        value = profile.get(section)
+        if section == "skills":
+            score += weight * min(len(value or []), 5) / 5
+        elif section == "connections":
+            connections = int(re.sub(r"\D", "", str(value or "")) or 0)
+            score += weight * min(connections, 500) / 500
+        elif value:
+            score += weight
+    return int(round(score))
+
+
+def _contains(text, keywords):
+    """Whole-word match, so e.g. "cto" does not match "director"."""
+    return any(re.search(rf"\b{re.escape(keyword)}\b", text, re.IGNORECASE) for keyword in keywords)
+
+
+def recent_career_type(experience):
+    title = experience.get("title") or ""
+    if _contains(title, FOUNDER_TITLES):
+        return "Founder"
+    if _contains(title, LEADERSHIP_TITLES):
+        return "leadership"
+    if _contains(title, CONSULTING_TITLES):
+        return "consulting"
+    details = f"{experience.get('subtitle') or ''} {experience.get('caption') or ''}".lower()
+    for keyword, career_type in EMPLOYMENT_TYPES:
+        if keyword in details:
+            return career_type
+    if _contains(title, ("intern",)):
+        return "internship"
+    return None
+
+
+def experience_level(years, title):
+    if _contains(title, LEADERSHIP_TITLES + FOUNDER_TITLES) and years >= 5:
+        return "senior"
+    if years < 3:
+        return "junior"
+    if years < 8:
+        return "mid-level"
+    return "senior"
+
+
+def career_stage(years, title):
+    if _contains(title, LEADERSHIP_TITLES):
+        return "Director"
+    if years < 5:
+        return "early career"
+    if years < 15:
+        return "mid-career"
+    return "late career"
+
+
+def extract_profile_features(profile, today=None):
+    """ProfileContext fields that can be inferred from the raw Apify item.
+
+    Fields that cannot be worked out with confidence are left out, so the
+    caller knows which ones still need the LLM.
+    """
+    features = {"profile_completeness": profile_completeness(profile)}
+    experiences = profile.get("experiences") or []
+    if not experiences:
+        return features
+
+    current = experiences[0]
+    title = current.get("title") or ""
+    if title:
+        features["role_type"] = title
+    career_type = recent_career_type(current)
+    if career_type:
+        features["recent_career_type"] = career_type
+
+    months = total_experience_months(experiences, today)
+    if months is not None:
+        years = round(months / 12, 1)
+        features["total_work_experience"] = years
+        features["experience_level"] = experience_level(years, title)
+        features["career_stage"] = career_stage(years, title)
+    return features
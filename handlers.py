@@ -0,0 +1,1040 @@
+#---analysis handlers
+# Everything between a scraped profile and a generated answer: profile context, handler prompts,
+# routing, generation and the response cache. Functions read the per-user state from a `session`
+# argument rather than from Streamlit, so they run the same in the app and in batch.py.
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import hashlib
+import json
+import re
+import time
+from google.genai import types
+from pydantic import BaseModel
+from cache import SingleFlight, TTLCache
+from clients import HEDGE_AFTER, generate_content, generate_content_stream, get_gemini_client, token_counts
+from config import get_setting
+from features import extract_profile_features
+from intent import classify_locally
+from memory import ConversationMemory, estimate_tokens, local_summarizer, role_name
+from metrics import metrics
+from model_router import model_usage, router
+from profile_model import Profile, SECTIONS
+from prompt_cache import PromptPrefixCache
+from role_index import role_index, RoleMatch
+
+# local intent predictions below this confidence are sent to the LLM classifier
+INTENT_CONFIDENCE_THRESHOLD = get_setting("INTENT_CONFIDENCE_THRESHOLD", 0.8, float)
+# "two_call" classifies ambiguous queries and then generates, "single_call" does both in one request
+ROUTING_STRATEGY = get_setting("ROUTING_STRATEGY", "two_call")
+
+# answers shared by every session; keys cover everything that goes into the prompt
+response_cache = TTLCache(
+    ttl=get_setting("RESPONSE_CACHE_TTL", 3600, float),
+    max_entries=get_setting("RESPONSE_CACHE_MAX_ENTRIES", 256, int),
+)
+
+# errors are printed by default; the Streamlit app shows them with st.error instead
+error_handler = print
+
+def report_error(message):
+    error_handler(message)
+
+def record_tokens(span, model, input_tokens, output_tokens):
+    """Adds a response's token counts to its generation span and the per-model counters."""
+    span.update(input_tokens=input_tokens, output_tokens=output_tokens)
+    metrics.count("prompt_tokens", input_tokens or 0, model=model)
+    metrics.count("response_tokens", output_tokens or 0, model=model)
+
+def generate_validated(task, prompt, validate, experience_level=None, config=None, prompt_cache=None, hedge_after=None, priority="interactive",
+                       annotate=None):
+    """Generates with the model routed for `task` and returns validate(response).
+
+    When `validate` raises ValueError (which covers JSON and pydantic errors), the
+    request is repeated on the next stronger model until the escalation chain ends.
+    `annotate(result)` may return details of a valid result to add to its generation span.
+    """
+    model = router.model_for(task, experience_level)
+    while True:
+        contents, request_config = prompt_cache.request(prompt, model, config) if prompt_cache else (prompt, config)
+        with metrics.span("generation", task=task, model=model) as span:
+            response = generate_content(model=model, contents=contents, config=request_config, hedge_after=hedge_after, priority=priority)
+            record_tokens(span, model, *token_counts(response))
+            try:
+                result = validate(response)
+            except ValueError as e:
+                span["invalid_output"] = True
+                error = e
+            else:
+                if annotate:
+                    span.update(annotate(result))
+                return result
+        stronger = router.escalate(model)
+        if stronger is None:
+            raise error
+        model_usage.record_escalation(model)
+        print(f"{task}: {model} output failed validation ({error}), retrying with {stronger}")
+        model = stronger
+
+def response_text(response):
+    text = (response.text or "").strip()
+    if not text:
+        raise ValueError("empty response")
+    return text
+
+# Defineing Pydantic model
+class ProfileContext(BaseModel):
+    experience_level: str
+    industry: str
+    career_stage: str
+    recent_career_type: str
+    total_work_experience: float
+    role_type: str
+    profile_completeness: int
+
+#memory 
+def summarize_with_llm(summary, messages, token_limit, priority="interactive"):
+    """LLM summarizer for ConversationMemory; keeps the previous summary if the call fails.
+
+    It runs while a reply is being prepared, so it uses the priority of the session it summarizes for.
+    """
+    transcript = "\n".join(f"{role_name(message)}: {message['content']}" for message in messages)
+    prompt = f"""Update the running summary of a LinkedIn coaching conversation with the new messages below.
+    Keep facts about the user, their goals and the advice already given. Use at most {token_limit * 3} characters.
+
+    CURRENT SUMMARY:
+    {summary or "(empty)"}
+
+    NEW MESSAGES:
+    {transcript}
+
+    Respond with only the updated summary."""
+    try:
+        return generate_validated("memory_summary", prompt, response_text, priority=priority)
+    except Exception as e:
+        print(f"Memory summarization failed: {e}")
+        return local_summarizer(summary, messages, token_limit)
+
+def new_conversation_memory(priority="interactive"):
+    return ConversationMemory(
+        token_budget=get_setting("MEMORY_TOKEN_BUDGET", 2000, int),
+        summarizer=partial(summarize_with_llm, priority=priority) if get_setting("MEMORY_SUMMARIZER", "local") == "llm" else None,
+        retrieval_top_k=get_setting("MEMORY_RETRIEVAL_TOP_K", 4, int),
+    )
+
+def new_prompt_cache():
+    return PromptPrefixCache(
+        get_gemini_client(), get_setting("PROMPT_CACHE_MODEL", router.default),
+        ttl=get_setting("PROMPT_CACHE_TTL", 3600, float),
+        min_tokens=get_setting("PROMPT_CACHE_MIN_TOKENS", 4096, int),
+        enabled=get_setting("PROMPT_CACHE_ENABLED", True, bool),
+    )
+
+class Session:
+    """Per-user state the handlers work on.
+
+    The Streamlit app passes `st.session_state`, which has the same attributes;
+    batch runs use one Session per profile. `priority` is the scheduler
+    priority of the session's Gemini requests.
+    """
+
+    def __init__(self, priority="interactive"):
+        self.priority = priority
+        self.profile_context = None
+        self.profile_data = None
+        self.profile_item = None
+        self.profile = None
+        self.prompt_cache = new_prompt_cache()
+        self.chat_history = []
+        self.job_titles = []
+        self.conversation_memory = new_conversation_memory(priority)
+        self.changed_sections = None
+        self.response_key = None
+
+    @classmethod
+    def copy_of(cls, session, priority=None):
+        """A Session with the same profile, safe to use from worker threads while `session` changes.
+
+        The copy shares the prompt cache but gets its own history list and memory.
+        """
+        copy = cls(priority or session.priority)
+        copy.prompt_cache = session.prompt_cache
+        copy.profile_context = session.profile_context
+        copy.profile_data = session.profile_data
+        copy.profile_item = session.profile_item
+        copy.profile = session.profile
+        copy.job_titles = list(session.job_titles)
+        copy.chat_history = list(session.chat_history)
+        return copy
+
+def get_conversation_memory(session):
+    """Recent turns verbatim, a summary of older ones and the older messages most relevant to the latest query"""
+    return session.conversation_memory.render(session.chat_history)
+# ProfileContext fields and the format the LLM is asked to return them in
+CONTEXT_FIELD_FORMATS = {
+    "experience_level": '"junior/mid-level/senior"',
+    "industry": '"Tech/Financial Services/Healthcare/Marketing and Advertising/Construction/Education/Retail" based on thair complete profile',
+    "career_stage": '"early career/mid-career/late career/Director"',
+    "recent_career_type": '"full-time/part-time/internship/freelance/Founder/leadership/consulting/entrepreneurial"',
+    "total_work_experience": "work experience in Years in Float",
+    "role_type": '"current role title"',
+    "profile_completeness": '"percentage completeness only in integer"',
+}
+# profile sections each ProfileContext field is inferred from; a field is only recomputed when one of them changes
+CONTEXT_FIELD_SECTIONS = {
+    "experience_level": ("headline", "experience"),
+    "industry": ("headline", "about", "skills", "experience"),
+    "career_stage": ("headline", "experience"),
+    "recent_career_type": ("experience",),
+    "total_work_experience": ("experience",),
+    "role_type": ("headline", "experience"),
+    "profile_completeness": SECTIONS,
+}
+# contexts shared by every session, so a popular profile is only analyzed once per TTL
+context_cache = TTLCache(
+    ttl=get_setting("PROFILE_CONTEXT_CACHE_TTL", 24 * 3600, float),
+    max_entries=get_setting("PROFILE_CONTEXT_CACHE_MAX_ENTRIES", 500, int),
+)
+context_flights = SingleFlight()
+
+# Function to get profile context from scraped data
+def reusable_context_fields(context, changed_sections):
+    """Fields of an earlier ProfileContext that none of the changed sections feed into."""
+    return {field: value for field, value in context.model_dump().items()
+            if not changed_sections.intersection(CONTEXT_FIELD_SECTIONS[field])}
+
+def get_profile_context(profile_data, profile_item=None, priority="interactive", known_fields=None):
+    """ProfileContext of a scraped profile; concurrent requests for the same profile share one computation.
+
+    `known_fields` are ProfileContext values still valid from an earlier analysis of
+    the profile; only the remaining fields are computed.
+    """
+    key = hashlib.sha256(json.dumps([profile_data, profile_item], sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    with metrics.span("profile_context") as span:
+        context = context_cache.get(key)
+        span["cache_hit"] = context is not None
+        metrics.count("cache_lookups", cache="profile_context", result="hit" if context is not None else "miss")
+        if context is not None:
+            return context
+
+        def compute():
+            context = compute_profile_context(profile_data, profile_item, priority, known_fields)
+            if context is not None:
+                context_cache.put(key, context)
+            return context
+        return context_flights.do(key, compute)
+
+def compute_profile_context(profile_data, profile_item=None, priority="interactive", known_fields=None):
+    # fields that can be read from the raw scrape are computed locally, the LLM only fills the rest
+    context_fields = {**(known_fields or {}), **(extract_profile_features(profile_item) if profile_item else {})}
+    missing_fields = [field for field in CONTEXT_FIELD_FORMATS if field not in context_fields]
+    if not missing_fields:
+        return ProfileContext(**context_fields)
+
+    json_format = ",\n        ".join(f'"{field}": {CONTEXT_FIELD_FORMATS[field]}' for field in missing_fields)
+    prompt = f"""
+    Analyze this LinkedIn profile and return JSON:
+    {profile_data}
+    
+    JSON format:
+    {{
+        {json_format}
+    }}
+    """
+
+    def parse(response):
+        text_response = response.text.strip()
+        if text_response.startswith("```"):
+            text_response = text_response.strip("```json").strip("```").strip()
+        parsed_dict = json.loads(text_response)
+        if not isinstance(parsed_dict, dict):
+            raise ValueError("expected a JSON object")
+        return ProfileContext(**{**parsed_dict, **context_fields})
+
+    try:
+        return generate_validated("profile_context", prompt, parse, context_fields.get("experience_level"), priority=priority)
+    except ValueError as e:
+        report_error(f"Error parsing profile context: {e}")
+        return None
+# profile sections each handler's prompt needs
+HANDLER_SECTIONS = {
+    "content_rewrite_or_generation": SECTIONS,
+    "profile_analysis": SECTIONS,
+    "job_fit_analysis": ("name", "headline", "about", "skills", "experience", "education"),
+    "career_counseling_skill_gap_analysis": ("skills", "experience", "education"),
+    "general_prompt_handler": ("name", "headline", "about"),
+}
+# content rewrites only need the sections the query is about
+QUERY_SECTIONS = {
+    "headline": ("name", "headline", "about"),
+    "about": ("name", "headline", "about", "skills", "experience"),
+    "summary": ("name", "headline", "about", "skills", "experience"),
+    "skill": ("headline", "skills", "experience"),
+    "experience": ("headline", "experience"),
+    "education": ("headline", "education"),
+}
+def content_sections(user_input):
+    query = user_input.lower()
+    sections = set()
+    for keyword, wanted in QUERY_SECTIONS.items():
+        if keyword in query:
+            sections.update(wanted)
+    return sections or HANDLER_SECTIONS["content_rewrite_or_generation"]
+
+def profile_text(session, sections=SECTIONS):
+    """Rendered profile sections; falls back to the full scrape summary without a parsed profile"""
+    if session.profile is None:
+        return session.profile_data
+    return session.profile.render(sections)
+
+def handler_sections(handler_name, user_input):
+    if handler_name == "content_rewrite_or_generation":
+        return content_sections(user_input)
+    return HANDLER_SECTIONS[handler_name]
+
+def prompt_sections(session, handler_name, user_input):
+    """Profile sections a handler's prompt actually renders; the router and an active prompt cache use the full profile."""
+    if session.prompt_cache.active or handler_name not in HANDLER_SECTIONS:
+        return SECTIONS
+    sections = handler_sections(handler_name, user_input)
+    if handler_name == "content_rewrite_or_generation" and session.profile_context.experience_level == "junior":
+        # the junior prompt also quotes the connection count
+        sections = set(sections) | {"network"}
+    return sections
+
+def prompt_prefix(session, sections=SECTIONS):
+    """Static start of every handler prompt: profile sections, context and industry guidance.
+
+    It only changes when the profile is re-analyzed, so it can be served from
+    Gemini's context cache; while a cache is active it always holds the full profile.
+    """
+    if session.prompt_cache.active:
+        sections = SECTIONS
+    context = session.profile_context
+    return f"""PROFILE DATA:
+{profile_text(session, sections)}
+
+CONTEXT:
+- Experience Level: {context.experience_level}
+- Industry: {context.industry}
+- Career Stage: {context.career_stage}
+- Recent Career Type: {context.recent_career_type}
+- Total Work Experience: {context.total_work_experience} years
+- Current Role: {context.role_type}
+- Profile Completeness: {context.profile_completeness}%
+
+Industry Context: {industry_based_context(session)}
+
+"""
+# getting industry based context 
+def industry_based_context(session):
+    industry_contexts = {
+        "Tech": "Fast-paced, emphasize technical skills, adaptability, innovation.",
+        "Financial Services": "Focus on analytical skills, attention to detail, financial regulations.",
+        "Healthcare": "Highlight empathy, patient care, medical practices knowledge.",
+        "Marketing and Advertising": "Emphasize creativity, communication, market trends.",
+        "Construction": "Value safety, project management, technical building expertise.",
+        "Education": "Focus on teaching methods, student engagement, curriculum development.",
+        "Retail": "Emphasize customer service, sales techniques, inventory management."
+    }
+    return industry_contexts.get(session.profile_context.industry, "General industry guidance.")
+#Content generation and rewrite agent based on experience and industry context
+def content_rewrite_or_generation(session, context, user_input, memory_context=""):
+    prefix = prompt_prefix(session, handler_sections("content_rewrite_or_generation", user_input))
+    
+    if context.experience_level == "junior":
+        return f"""{prefix}{memory_context}You are a linkedin guru. Be concise and give friendly response to the user
+        Optimizing or generating content asked in the query of the user
+        {user_input}
+        to the LinkedIn profile above to match a junior level experience in the {context.industry} industry.
+        
+        1. The asked section should be rewritten and optimized according to the years of experience {context.total_work_experience} and recently working in role {context.role_type} as {context.recent_career_type}.
+        2. Simplify technical language.
+        3. Include step-by-step guidance if needed.
+        4. Help user Optimize the section asked by the user to increase its hiring chances.
+        5. Include the Options or examples in markdown format that is easy to copy and paste.
+        6. Improve profile completeness from {context.profile_completeness}.
+        7. check if the number of connections is less i.e. number of connections in {profile_text(session, ("network",))},if so suggest to increase connections.
+        avoide leadership advice
+        """
+    elif context.experience_level == "mid-level":
+        return f"""{prefix}{memory_context}You are a linkedin guru. Be concise and give professional response to the user
+        Optimizing or generating content asked in the query of the user
+        {user_input}
+        to the LinkedIn profile above to match a mid-level level experience in the {context.industry} industry.
+        
+        1. The asked section should be rewritten and optimized according to the years of experience {context.total_work_experience} and recently working in role {context.role_type} as {context.recent_career_type}.
+        2. Use technical language.
+        3. Include growth and leadership qualities.
+        4. Help user Optimize the section asked by the user to increase its future hiring chances and expand its reach.
+        5. Include the Options or examples in markdown format that is easy to copy and paste.
+        6. Improve profile completeness from {context.profile_completeness}.
+        """
+    elif context.experience_level == "senior":
+        return f"""{prefix}{memory_context}You are a linkedin guru. Be concise and give professional and specialised response to the user
+        Optimizing or generating content asked in the query of the user
+        {user_input}
+        to the LinkedIn profile above to match a senior level experience in the {context.industry} industry.
+        
+        1. The asked section should be rewritten and optimized according to the years of experience {context.total_work_experience} and recently working in role {context.role_type} as {context.recent_career_type}.
+        2. Use technical language.
+        3. Include leadership and growth strategies if needed.
+        4. Help user Optimize the section asked by the user to increase its reach and audience.
+        5. Include the Options or examples in markdown format that is easy to copy and paste.
+        6. Improve profile completeness from {context.profile_completeness}.
+        """
+#analysing the profile
+def profile_analysis(session, context, user_input, memory_context=""):
+    prefix = prompt_prefix(session, handler_sections("profile_analysis", user_input))
+    
+    if context.experience_level == "junior":
+        return f"""{prefix}{memory_context}You are a LinkedIn profile analysis expert. Be encouraging and provide friendly, supportive guidance for a junior professional.
+
+        USER QUERY: {user_input}
+        
+        As a junior professional, focus your analysis on:
+
+        1. **Profile Foundation Assessment**:
+           - About Section: Is it clear, enthusiastic, and shows potential?
+           - Experience Section: Are internships, projects, and part-time work well-described?
+           - Skills Section: Balance of technical and soft skills for entry-level roles
+           - Education Section: Academic projects, coursework, and achievements
+           - Certifications: Entry-level certifications and online courses
+
+        2. **Entry-Level Optimization**:
+           - Highlighting transferable skills from education and internships
+           - Showcasing personal projects and volunteer work
+           - Demonstrating eagerness to learn and grow
+           - Missing foundational skills for {context.industry}
+
+        3. **Profile Building Strategy**:
+           - Current completeness score: {context.profile_completeness}%
+           - Quick wins to improve profile visibility
+           - Essential sections to complete first
+           - How to make the most of limited experience
+
+        4. **Junior-Level Best Practices**:
+           - How to stand out as a new graduate/junior professional
+           - Keywords that recruiters look for in junior candidates
+           - Building credibility with limited experience
+           - Networking strategies for career starters
+
+        5. **Growth-Focused Action Plan**:
+           - Immediate steps to strengthen profile
+           - Skills to develop and showcase
+           - How to gain relevant experience
+           - Building a professional network
+
+        Use simple language, provide step-by-step guidance, and focus on building confidence. Format in markdown with clear sections.
+        """
+    
+    elif context.experience_level == "mid-level":
+        return f"""{prefix}{memory_context}You are a LinkedIn profile analysis expert. Provide professional and strategic guidance for a mid-level professional.
+
+        USER QUERY: {user_input}
+        
+        As a mid-level professional, focus your analysis on:
+
+        1. **Professional Growth Assessment**:
+           - About Section: Does it reflect career progression and future aspirations?
+           - Experience Section: Are achievements quantified and impact clearly shown?
+           - Skills Section: Advanced technical skills and emerging leadership abilities
+           - Education Section: Continued learning and professional development
+           - Certifications: Industry-relevant and advanced certifications
+
+        2. **Career Advancement Optimization**:
+           - Demonstrating progression from junior to mid-level responsibilities
+           - Leadership experience and team collaboration
+           - Strategic thinking and problem-solving capabilities
+           - Industry expertise and specialized knowledge gaps
+
+        3. **Competitive Positioning**:
+           - Current completeness score: {context.profile_completeness}%
+           - How to stand out among other mid-level professionals
+           - Thought leadership opportunities
+           - Building authority in {context.industry}
+
+        4. **Mid-Level Professional Standards**:
+           - Industry benchmarks for {context.total_work_experience} years of experience
+           - Advanced keywords and technical terminology
+           - Networking for career advancement
+           - Building a professional brand
+
+        5. **Strategic Career Development**:
+           - Preparing for senior-level transitions
+           - Skill gaps for next career level
+           - Leadership development opportunities
+           - Industry trend alignment
+
+        Use professional language, focus on strategic career moves, and emphasize growth potential. Format in markdown with clear sections and be dynamic to the user query.
+        """
+    
+    elif context.experience_level == "senior":
+        return f"""{prefix}{memory_context}You are a LinkedIn profile analysis expert. Provide sophisticated and strategic guidance for a senior professional.
+
+        USER QUERY: {user_input}
+        
+        As a senior professional, focus your analysis on:
+
+        1. **Executive Presence Assessment**:
+           - About Section: Does it convey thought leadership and strategic vision?
+           - Experience Section: Are major achievements and business impact highlighted?
+           - Skills Section: Leadership competencies and industry expertise
+           - Education Section: Executive education and board positions
+           - Certifications: Executive-level credentials and thought leadership
+
+        2. **Leadership and Impact Optimization**:
+           - Demonstrating organizational influence and strategic decision-making
+           - Mentorship and team development capabilities
+           - Industry contributions and innovation leadership
+           - Business transformation and growth initiatives
+
+        3. **Executive-Level Positioning**:
+           - Current completeness score: {context.profile_completeness}%
+           - Thought leadership and industry recognition
+           - Speaking engagements and publications
+           - Board positions and advisory roles
+
+        4. **Senior Professional Standards**:
+           - C-suite and executive-level expectations
+           - Industry thought leadership opportunities
+           - Strategic networking and relationship building
+           - Personal brand as an industry expert
+
+        5. **Legacy and Succession Planning**:
+           - Knowledge transfer and mentorship opportunities
+           - Industry contributions and lasting impact
+           - Succession planning and talent development
+           - Future-proofing career trajectory
+
+        Use sophisticated language, focus on strategic leadership, and emphasize industry influence. Format in markdown with clear sections dinamically chosen as per user query.
+        """
+#Job fit score to the given job titles
+def job_fit_analysis(session, context, user_input, memory_context=""):
+    prefix = prompt_prefix(session, handler_sections("job_fit_analysis", user_input))
+    
+    return f"""{prefix}{memory_context}You are a job fit analysis expert. Analyze how well the LinkedIn profile matches the target job role{session.job_titles}. Be Short and concise in answering.
+
+    USER QUERY (including target job role): {user_input}
+    
+    Please provide a comprehensive job fit analysis:
+
+    
+
+    1. **Match Score Analysis**:
+       - **Overall match score (0-100%)** in Large text.
+       - Skills match score
+       - Experience match score
+       - Education/certification match score
+       - Industry experience match score
+    2. **Job Role Understanding**:
+       - Extract the target job role from the user query
+       - Create a standard job description for this role in the {context.industry} industry
+       - List key requirements, skills, and qualifications typically needed
+
+    3. **Strengths Alignment**:
+       - Profile elements that strongly match the job requirements
+       - Relevant experience and achievements
+       - Transferable skills that add value
+
+    4. **Gap Analysis**:
+       - Missing skills or qualifications
+       - Experience gaps
+       - Certification or education requirements not met
+       - Industry-specific knowledge gaps
+
+    5. **Improvement Recommendations**:
+       - Immediate actions to improve match score
+       - Skills to develop or highlight
+       - Experience to emphasize or reframe
+       - Keywords to add for ATS optimization
+       - Sections to update or strengthen
+
+    6. **Application Strategy**:
+       - How to position the profile for this role
+       - Cover letter key points
+       - Interview preparation focus areas
+       - Network targeting suggestions
+    choose the answer structure dinamically according to user query.
+    Format the response in markdown with clear sections, match scores, and actionable recommendations.
+    """
+
+def career_counseling_skill_gap_analysis(session, context, user_input, memory_context=""):
+    prefix = prompt_prefix(session, handler_sections("career_counseling_skill_gap_analysis", user_input))
+    
+    return f"""{prefix}{memory_context}You are a career counseling expert specializing in skill gap analysis and career development,be short and concise in answering .
+
+    USER QUERY: {user_input}
+    TARGATING ROLS {session.job_titles}
+    Please provide comprehensive career counseling and skill gap analysis based on the following structure which can be dimamically modified as per user need:
+
+    1. **Current Skills Assessment**:
+       - Technical skills inventory
+       - Soft skills evaluation
+       - Industry-specific competencies
+       - Leadership and management capabilities
+       - Certification and qualification status
+
+    2. **Career Path Analysis**:
+       - Potential career trajectories based on current profile
+       - Natural progression opportunities in {context.industry}
+       - Lateral movement possibilities
+       - Industry transition opportunities
+
+    3. **Target Role Requirements**:
+       - Skills needed for desired career progression
+       - Industry standards for next-level positions
+       - Emerging skills in {context.industry}
+       - Future-proof skills for career longevity
+
+    4. **Skill Gap Identification**:
+       - Critical missing skills for career advancement
+       - Nice-to-have skills for competitive advantage
+       - Outdated skills that need updating
+       - Soft skills development needs
+
+    5. **Learning and Development Plan**:
+       - Priority skills to develop first
+       - Recommended learning resources (courses, certifications, books)
+       - Timeline for skill development
+       - Budget considerations for training
+
+    6. **Career Development Strategy**:
+       - Short-term goals (3-6 months)
+       - Medium-term objectives (6-18 months)
+       - Long-term career vision (2-5 years)
+       - Networking and mentorship recommendations
+
+    7. **Action Plan**:
+       - Immediate steps to take
+       - Milestone tracking suggestions
+       - Progress measurement methods
+       - Regular review and adjustment schedule
+
+    Format the response in markdown with clear sections, timelines, and specific resource recommendations.
+    """
+#Parallel job fit scoring across all target roles
+class JobFitScore(BaseModel):
+    match_score: int
+    missing_skills: list[str]
+    keywords: list[str]
+
+# only the best locally pre-scored roles get an LLM analysis
+JOB_FIT_LLM_TOP_N = get_setting("JOB_FIT_LLM_TOP_N", 5, int)
+# by default all of them are scored in one round; the scheduler caps the real concurrency
+JOB_FIT_MAX_WORKERS = get_setting("JOB_FIT_MAX_WORKERS", max(1, JOB_FIT_LLM_TOP_N), int)
+JOB_FIT_SCORE_CONFIG = types.GenerateContentConfig(response_mime_type="application/json", response_schema=JobFitScore)
+
+def job_fit_score_prompt(session, context, job_title):
+    return f"""{prompt_prefix(session, HANDLER_SECTIONS["job_fit_analysis"])}You are a job fit analysis expert. Score how well the LinkedIn profile above matches the target job role "{job_title}" in the {context.industry} industry.
+    
+    Return JSON with:
+    - match_score: overall match from 0 to 100
+    - missing_skills: the most important skills or qualifications the profile lacks for this role (at most 8)
+    - keywords: ATS keywords the profile should add for this role (at most 8)
+    """
+
+def profile_skills_and_titles(profile):
+    return profile.skills, [title for title, _, _ in profile.experiences]
+
+def score_job_titles(session, context, job_titles):
+    """Scores every target role; returns (job title, result) pairs, best first.
+    
+    A result is a JobFitScore, a local RoleMatch estimate or an error message.
+    
+    Roles are pre-scored against the local taxonomy and only JOB_FIT_LLM_TOP_N are sent to the LLM: titles
+    the taxonomy does not know come first, since they have no local estimate, then the best pre-scored ones.
+    """
+    estimates = {}
+    if session.profile is not None:
+        skills, titles = profile_skills_and_titles(session.profile)
+        estimates = {job_title: role_index.estimate(job_title, skills, titles) for job_title in job_titles}
+    ranked = sorted(job_titles, key=lambda job_title: estimates[job_title].score if estimates.get(job_title) else float("inf"), reverse=True)
+    llm_titles = ranked[:max(0, JOB_FIT_LLM_TOP_N)]
+    # prompts are built up front so the worker threads never touch the session
+    prompts = {job_title: job_fit_score_prompt(session, context, job_title) for job_title in llm_titles}
+    prompt_cache = session.prompt_cache
+    priority = session.priority
+    
+    def score(job_title):
+        try:
+            result = generate_validated(
+                "job_fit_score", prompts[job_title], lambda response: JobFitScore.model_validate_json(response.text),
+                context.experience_level, JOB_FIT_SCORE_CONFIG, prompt_cache, priority=priority)
+            return job_title, result
+        except Exception as e:
+            return job_title, estimates.get(job_title) or f"Error: {e}"
+    
+    results = []
+    if llm_titles:
+        with ThreadPoolExecutor(max_workers=max(1, min(len(llm_titles), JOB_FIT_MAX_WORKERS))) as pool:
+            results = list(pool.map(score, llm_titles))
+    results += [(job_title, estimates.get(job_title) or "Not scored") for job_title in ranked[len(llm_titles):]]
+    
+    def sort_key(result):
+        if isinstance(result[1], JobFitScore):
+            return (2, result[1].match_score)
+        if isinstance(result[1], RoleMatch):
+            return (1, result[1].score)
+        return (0, 0)
+    return sorted(results, key=sort_key, reverse=True)
+
+def job_fit_table(results):
+    rows = ["| Rank | Target Role | Match | Missing Skills | Keywords to Add |", "|---|---|---|---|---|"]
+    for rank, (job_title, result) in enumerate(results, 1):
+        if isinstance(result, JobFitScore):
+            rows.append(f"| {rank} | {job_title} | **{result.match_score}%** | {', '.join(result.missing_skills) or '—'} | {', '.join(result.keywords) or '—'} |")
+        elif isinstance(result, RoleMatch):
+            rows.append(f"| {rank} | {job_title} | ~{result.score}% (local estimate as {result.title}) | {', '.join(result.missing_skills[:8]) or '—'} | — |")
+        else:
+            rows.append(f"| {rank} | {job_title} | — | {result} | — |")
+    table = "### 🎯 Job Fit Ranking\n\n" + "\n".join(rows)
+    if any(isinstance(result, RoleMatch) for _, result in results):
+        table += "\n\n_Local estimates compare your skills and titles with a bundled role taxonomy; they were not analyzed by the LLM._"
+    return table
+
+def suggested_roles_table(profile, top_k=10):
+    """Markdown table of the taxonomy roles the profile fits best, computed without any network call."""
+    skills, titles = profile_skills_and_titles(profile)
+    rows = ["| Rank | Role | Industry | Fit | Matching Skills | Skills to Add |", "|---|---|---|---|---|---|"]
+    for rank, match in enumerate(role_index.rank(skills, titles, top_k), 1):
+        rows.append(f"| {rank} | {match.title} | {match.industry} | **{match.score}%** | {', '.join(match.matched_skills) or '—'} | {', '.join(match.missing_skills[:5]) or '—'} |")
+    return "### 🧭 Roles You May Fit\n\n" + "\n".join(rows) + "\n\n_Scored locally from your skills and experience titles._"
+#Fallback handler
+def general_prompt_handler(session, context, user_input, memory_context=""):
+    prefix = prompt_prefix(session, handler_sections("general_prompt_handler", user_input))
+    
+    return f"""{prefix}{memory_context}only solve the query 
+    {user_input} in short and concise manner and as
+    you are a linkedin expert only encorage the user to ask more questions and provide helpful insights like profile enhancement and job fit analysis in short for the profile above.
+    """
+#Routing agent 
+def classify_user_intent(user_input, priority="interactive"):
+    with metrics.span("classification") as span:
+        intent, confidence = classify_locally(user_input)
+        span.update(method="local", confidence=round(confidence, 3), intent=intent)
+        if confidence >= INTENT_CONFIDENCE_THRESHOLD:
+            return intent
+        span["method"] = "llm"
+        span["intent"] = classify_with_llm(user_input, priority)
+        return span["intent"]
+
+def classify_with_llm(user_input, priority="interactive"):
+    classification_prompt = f"""
+    Classify this query into one category:
+    1. "content_rewrite" - optimize/rewrite LinkedIn sections/generate content/change content etc.
+    2. "profile_analysis" - analyze profile gaps/evaluation/tell me about my profile/how is my profile etc.
+    3. "job_fit_analysis" - analyze job role fit/what are my chances for this job/how do I fit for this role etc.
+    4. "career_counseling" - career advice/skill gaps/how to advance my career/help in carrer progression etc.
+    5. "general" - other questions if not fitting into above categories.
+    
+    Query: "{user_input}"
+    
+    Respond with only the category name.
+    """
+
+    intent_mapping = {
+        "content_rewrite": "content_rewrite_or_generation",
+        "profile_analysis": "profile_analysis",
+        "job_fit_analysis": "job_fit_analysis",
+        "career_counseling": "career_counseling_skill_gap_analysis",
+        "general": "general_prompt_handler"
+    }
+    
+    def parse(response):
+        intent = (response.text or "").strip().strip('"`.').lower()
+        if intent not in intent_mapping:
+            raise ValueError(f"unknown category {intent!r}")
+        return intent_mapping[intent]
+
+    try:
+        # a classification is short, so a slow one is worth duplicating when hedging is enabled
+        return generate_validated("classification", classification_prompt, parse, hedge_after=HEDGE_AFTER, priority=priority)
+    except ValueError:
+        return "general_prompt_handler"
+    except Exception as e:
+        report_error(f"Error in intent classification: {e}")
+        return "general_prompt_handler"
+
+HANDLERS = {
+    "content_rewrite_or_generation": content_rewrite_or_generation,
+    "profile_analysis": profile_analysis,
+    "job_fit_analysis": job_fit_analysis,
+    "career_counseling_skill_gap_analysis": career_counseling_skill_gap_analysis,
+    "general_prompt_handler": general_prompt_handler
+}
+HANDLER_DESCRIPTIONS = {
+    "content_rewrite_or_generation": "optimize/rewrite LinkedIn sections/generate content/change content etc.",
+    "profile_analysis": "analyze profile gaps/evaluation/tell me about my profile/how is my profile etc.",
+    "job_fit_analysis": "analyze job role fit/what are my chances for this job/how do I fit for this role etc.",
+    "career_counseling_skill_gap_analysis": "career advice/skill gaps/how to advance my career/help in carrer progression etc.",
+    "general_prompt_handler": "other questions if not fitting into above categories."
+}
+# Quick Action buttons, in the order they are shown and prefetched
+def quick_actions(session):
+    """(label, query, handler name) of every Quick Action for the session's profile"""
+    if session.job_titles:
+        job_fit_query = f"Analyze my fit for {session.job_titles[0]} role"
+    else:
+        job_fit_query = "Analyze my profile for job opportunities"
+    return [
+        ("Analyze Profile", "Analyze my LinkedIn profile and identify key gaps and improvement areas", "profile_analysis"),
+        ("Improve About Section", "Rewrite and optimize my About section", "content_rewrite_or_generation"),
+        ("Improve Headline", "Rewrite and optimize my LinkedIn headline", "content_rewrite_or_generation"),
+        ("Optimize Skills", "Optimize my skills section for better visibility", "content_rewrite_or_generation"),
+        ("Job Fit Analysis", job_fit_query, "job_fit_analysis"),
+        ("Skill Gap Analysis", "What skills do I need to develop for career advancement?", "career_counseling_skill_gap_analysis"),
+    ]
+#Single-call router: the model picks a handler and answers with its instructions in the same request
+def build_router_prompt(session, context, user_input, memory_context=""):
+    handler_sections_text = []
+    for name, handler_function in HANDLERS.items():
+        # reuse each handler's prompt, without repeating the prefix and profile data it embeds
+        instructions = handler_function(session, context, user_input)
+        instructions = instructions[len(prompt_prefix(session, handler_sections(name, user_input))):]
+        if session.profile:
+            for fragment in sorted(session.profile.fragments(), key=len, reverse=True):
+                instructions = instructions.replace(fragment, "(see PROFILE DATA above)")
+        handler_sections_text.append(f"=== HANDLER: {name} ===\n{instructions.strip()}")
+    handler_list = "\n".join(f'    - "{name}": {description}' for name, description in HANDLER_DESCRIPTIONS.items())
+    
+    return f"""{prompt_prefix(session)}{memory_context}You are a LinkedIn expert with several specialised handlers.
+    
+    USER QUERY: {user_input}
+    
+    First choose the one handler that best fits the user query:
+{handler_list}
+    
+    Write the chosen handler name on the first line as "HANDLER: <name>", then answer the user query
+    following only that handler's instructions below. Do not mention the handlers in your answer.
+    
+{chr(10).join(handler_sections_text)}
+    """
+
+def routed_handler(line):
+    """Handler named by a "HANDLER: <name>" line, or None if the line is not one."""
+    line = line.strip().strip("*#` ")
+    if not line.upper().startswith("HANDLER:"):
+        return None
+    name = line.split(":", 1)[1].strip().strip('"*` ')
+    return name if name in HANDLERS else "general_prompt_handler"
+
+def parse_routed_response(text):
+    """Splits a single-call response into (handler name, answer)."""
+    first_line, _, rest = text.partition("\n")
+    handler_name = routed_handler(first_line)
+    if handler_name is None:
+        return "general_prompt_handler", text
+    return handler_name, rest.strip()
+
+def strip_handler_line(chunks, span):
+    """Streaming counterpart of parse_routed_response: drops the HANDLER line from the first chunks
+    and records the chosen handler on the generation span.
+
+    Only the HANDLER line and its newline are removed; the rest of the text is
+    passed on unchanged, so whitespace at chunk boundaries is kept.
+    """
+    chunks = iter(chunks)
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        if "\n" in buffer:
+            break
+    first_line, newline, rest = buffer.partition("\n")
+    handler_name = routed_handler(first_line)
+    if handler_name is None:
+        handler_name, rest = "general_prompt_handler", buffer
+    span["handler"] = handler_name
+    if rest:
+        yield rest
+    yield from chunks
+
+STREAM_INTERRUPTED_NOTE = "\n\n_⚠️ The response was interrupted. Please try again._"
+
+def experience_level(session):
+    return session.profile_context.experience_level if session.profile_context else None
+
+def generate_text(session, prompt, task):
+    """Response text from the model routed for `task` (a handler name or "router").
+
+    Single-call router answers come without their HANDLER line; the chosen
+    handler is recorded on the generation span.
+    """
+    try:
+        if task == "router":
+            _, answer = generate_validated(task, prompt, lambda response: parse_routed_response(response_text(response)),
+                                           experience_level(session), prompt_cache=session.prompt_cache, priority=session.priority,
+                                           annotate=lambda routed: {"handler": routed[0]})
+            return answer
+        return generate_validated(task, prompt, response_text, experience_level(session),
+                                  prompt_cache=session.prompt_cache, priority=session.priority)
+    except Exception as e:
+        report_error(f"Error generating response: {e}")
+        return None
+
+def stream_text(session, prompt, task):
+    """Yields the response text as Gemini generates it; errors end the stream with a note.
+
+    Streamed text reaches the user as it arrives, so it is never escalated to another model.
+    Single-call router streams are passed through strip_handler_line.
+    """
+    model = router.model_for(task, experience_level(session))
+    contents, config = session.prompt_cache.request(prompt, model)
+    try:
+        with metrics.span("generation", task=task, model=model, stream=True) as span:
+            started = time.monotonic()
+            counts = (None, None)
+
+            def texts():
+                nonlocal counts
+                for chunk in generate_content_stream(model=model, contents=contents, config=config, priority=session.priority):
+                    span.setdefault("first_chunk", round(time.monotonic() - started, 4))
+                    if getattr(chunk, "usage_metadata", None) is not None:
+                        counts = token_counts(chunk)
+                    if chunk.text:
+                        yield chunk.text
+            try:
+                yield from strip_handler_line(texts(), span) if task == "router" else texts()
+            finally:
+                record_tokens(span, model, *counts)
+    except Exception as e:
+        report_error(f"Error generating response: {e}")
+        yield STREAM_INTERRUPTED_NOTE
+
+def profile_fingerprint(session, sections):
+    """Fingerprints of the given profile sections, or the whole scrape summary without a parsed profile"""
+    if session.profile is None:
+        return session.profile_data
+    fingerprints = session.profile.fingerprints()
+    return [fingerprints[section] for section in SECTIONS if section in sections]
+
+def response_cache_key(session, context, handler_name, user_input, memory_window):
+    """Hash of the profile sections the handler reads, the context, the handler and its model, the normalized query and the memory window.
+
+    `memory_window` is the memory block that goes into the prompt. Standalone
+    queries (Quick Actions) are built without one, so repeat clicks hit the
+    cache and no session's conversation leaks into an answer shared with
+    others. Editing a profile section only misses the cache for handlers whose
+    prompt renders that section.
+    """
+    normalized_query = " ".join(re.findall(r"\w+", user_input.lower()))
+    payload = json.dumps([
+        profile_fingerprint(session, prompt_sections(session, handler_name, user_input)),
+        context.model_dump(),
+        session.job_titles,
+        handler_name,
+        router.model_for(handler_name, context.experience_level),
+        normalized_query,
+        memory_window,
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def cache_stream(chunks, cache_key):
+    """Passes chunks through and caches the full text once the stream completes cleanly."""
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    text = "".join(parts).strip()
+    if text and not text.endswith(STREAM_INTERRUPTED_NOTE.strip()):
+        response_cache.put(cache_key, text)
+
+def process_user_query(session, user_input, intent_function=None, stream=False, standalone=False, regenerate=False,
+                       history=None, cache_key=None):
+    """Returns the response text, or an iterator of text chunks when `stream` is set.
+
+    Answers are served from the response cache unless `regenerate` is set.
+    Standalone queries (Quick Actions) are answered without the conversation
+    memory. `history` renders the memory from those messages instead of the
+    session's chat, and `cache_key` stores the answer under that key; together
+    they regenerate an earlier answer as it was asked. The key the answer is
+    cached under is left in `session.response_key`.
+    """
+    session.response_key = None
+    if not session.profile_context:
+        message = "Please provide a LinkedIn URL first to analyze your profile."
+        return iter([message]) if stream else message
+    
+    context = session.profile_context
+    routed = False
+    if intent_function is None and ROUTING_STRATEGY == "single_call":
+        intent_function, confidence = classify_locally(user_input)
+        routed = confidence < INTENT_CONFIDENCE_THRESHOLD
+    if not routed:
+        # quick actions already know their handler
+        intent_function = intent_function or classify_user_intent(user_input, session.priority)
+    
+    if standalone:
+        memory_context = ""
+    elif history is not None:
+        memory_context = new_conversation_memory(session.priority).render(history)
+    else:
+        memory_context = get_conversation_memory(session)
+    cache_key = cache_key or response_cache_key(session, context, "router" if routed else intent_function, user_input, memory_context)
+    session.response_key = cache_key
+    cached = None if regenerate else response_cache.get(cache_key)
+    if not regenerate:
+        metrics.count("cache_lookups", cache="response", result="hit" if cached else "miss")
+    if cached:
+        return iter([cached]) if stream else cached
+    
+    with metrics.span("prompt_build", handler="router" if routed else intent_function) as span:
+        if routed:
+            prompt = build_router_prompt(session, context, user_input, memory_context)
+        else:
+            handler_function = HANDLERS.get(intent_function, general_prompt_handler)
+            prompt = handler_function(session, context, user_input, memory_context)
+        span["prompt_tokens"] = estimate_tokens(prompt)
+    
+    task = "router" if routed else intent_function
+    if stream:
+        return cache_stream(stream_text(session, prompt, task), cache_key)
+    response = generate_text(session, prompt, task)
+    if response:
+        response_cache.put(cache_key, response)
+    return response
+
+def analyze_profile(session, profile_item, profile_data, job_titles=None):
+    """Stores a scraped profile in the session and works out its context; returns False if that fails.
+
+    When the session already holds an earlier scrape of the same profile, the
+    sections that changed are stored in `session.changed_sections` and only
+    the context fields depending on them are recomputed.
+    """
+    previous, profile = session.profile, Profile.from_item(profile_item)
+    session.changed_sections = None
+    known_fields = None
+    if previous is not None and session.profile_context is not None and profile.url and previous.url == profile.url:
+        session.changed_sections = profile.changed_sections(previous)
+        known_fields = reusable_context_fields(session.profile_context, session.changed_sections)
+        metrics.count("context_fields", len(known_fields), result="reused")
+    session.profile_data = profile_data
+    session.profile_item = profile_item
+    session.profile = profile
+    context = get_profile_context(profile_data, profile_item, session.priority, known_fields)
+    if not context:
+        return False
+    session.profile_context = context
+    # a re-analyzed profile replaces the cached prompt prefix
+    session.prompt_cache.register(prompt_prefix(session, SECTIONS))
+    if job_titles:
+        session.job_titles = list(job_titles)
+    return True
+
+def session_snapshot(session):
+    """The analyzed profile of a session as plain data, for a session store."""
+    return {
+        "profile_item": session.profile_item,
+        "profile_data": session.profile_data,
+        "profile_context": session.profile_context.model_dump() if session.profile_context else None,
+        "job_titles": list(session.job_titles),
+    }
+
+def restore_session(session, snapshot):
+    """Puts a snapshot from session_snapshot back into a session without any LLM call."""
+    session.profile_item = snapshot.get("profile_item")
+    session.profile_data = snapshot.get("profile_data")
+    session.profile = Profile.from_item(session.profile_item) if session.profile_item else None
+    session.profile_context = ProfileContext(**snapshot["profile_context"]) if snapshot.get("profile_context") else None
+    session.job_titles = list(snapshot.get("job_titles") or [])
+    if session.profile_context is not None:
+        session.prompt_cache.register(prompt_prefix(session, SECTIONS))
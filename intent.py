@@ -0,0 +1,82 @@
+#---offline intent classifier
+# Routes chat queries to a handler without a network call: keyword rules first, then a small
+# multinomial naive Bayes model trained on the labelled queries in intent_examples.json.
+import json
+import math
+import os
+import re
+from collections import Counter
+
+EXAMPLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_examples.json")
+STOPWORDS = {"a", "an", "the", "my", "me", "i", "to", "for", "of", "and", "in", "on", "is", "it", "this", "be", "do", "you", "can", "please"}
+
+# a query matching rules for exactly one handler is routed with high confidence
+KEYWORD_RULES = {
+    "content_rewrite_or_generation": r"\b(rewrite|re-?write|rephrase|optimi[sz]e|draft|write|generate|polish)\b",
+    "profile_analysis": r"\b(analy[sz]e my (linkedin )?profile|review my profile|evaluate my profile|audit|critique|how is my profile)\b",
+    "job_fit_analysis": r"\b(fit for|my fit|match score|my chances|qualif(y|ied)|job fit|good fit|job description)\b",
+    "career_counseling_skill_gap_analysis": r"\b(skill gaps?|career (advancement|path|progression|roadmap|growth)|upskill|certifications?|transition|promoted)\b",
+}
+KEYWORD_CONFIDENCE = 0.95
+
+
+def tokenize(text):
+    words = [word for word in re.findall(r"[a-z]+", text.lower()) if word not in STOPWORDS]
+    return words + [f"{first}_{second}" for first, second in zip(words, words[1:])]
+
+
+class IntentClassifier:
+    """Multinomial naive Bayes over unigrams and bigrams with Laplace smoothing."""
+
+    def __init__(self, examples):
+        self.intents = list(examples)
+        total = sum(len(queries) for queries in examples.values())
+        self.vocabulary = set()
+        self.log_priors = {}
+        self.token_counts = {}
+        for intent, queries in examples.items():
+            counts = Counter(token for query in queries for token in tokenize(query))
+            self.token_counts[intent] = counts
+            self.vocabulary.update(counts)
+            self.log_priors[intent] = math.log(len(queries) / total)
+        self.log_likelihoods = {}
+        self.unseen_log_likelihood = {}
+        for intent, counts in self.token_counts.items():
+            denominator = sum(counts.values()) + len(self.vocabulary)
+            self.log_likelihoods[intent] = {token: math.log((count + 1) / denominator) for token, count in counts.items()}
+            self.unseen_log_likelihood[intent] = math.log(1 / denominator)
+
+    @classmethod
+    def from_file(cls, path=EXAMPLES_PATH):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def probabilities(self, text, intents=None):
+        tokens = [token for token in tokenize(text) if token in self.vocabulary]
+        scores = {}
+        for intent in intents or self.intents:
+            likelihoods = self.log_likelihoods[intent]
+            unseen = self.unseen_log_likelihood[intent]
+            scores[intent] = self.log_priors[intent] + sum(likelihoods.get(token, unseen) for token in tokens)
+        best = max(scores.values())
+        exp_scores = {intent: math.exp(score - best) for intent, score in scores.items()}
+        norm = sum(exp_scores.values())
+        return {intent: score / norm for intent, score in exp_scores.items()}, bool(tokens)
+
+    def predict(self, text):
+        """Returns (handler name, confidence between 0 and 1)."""
+        matched = [intent for intent, pattern in KEYWORD_RULES.items() if re.search(pattern, text, re.IGNORECASE)]
+        if len(matched) == 1:
+            return matched[0], KEYWORD_CONFIDENCE
+        probabilities, known = self.probabilities(text, matched or None)
+        if not known:
+            return "general_prompt_handler", 0.0
+        intent = max(probabilities, key=probabilities.get)
+        return intent, probabilities[intent]
+
+
+classifier = IntentClassifier.from_file()
+
+
+def classify_locally(text):
+    return classifier.predict(text)
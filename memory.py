@@ -0,0 +1,203 @@
+#---conversation memory
+# Renders the chat history for prompts within a token budget: recent turns are kept verbatim,
+# older turns are folded into a running summary that is only ever extended, never rebuilt,
+# and older messages relevant to the current query are pulled back in through a BM25 index.
+import math
+import re
+from collections import Counter
+
+STOPWORDS = {"a", "an", "the", "my", "me", "i", "to", "for", "of", "and", "or", "in", "on", "is", "it", "this", "that",
+             "be", "do", "you", "your", "can", "with", "what", "how", "are", "as", "at", "by", "from", "about", "please"}
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token), good enough for budgeting."""
+    return len(text) // 4 + 1
+
+
+def tokenize(text):
+    return [word for word in re.findall(r"[a-z0-9+#]+", text.lower()) if word not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over a growing list of documents; adding one never re-scans the others."""
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_counts = []
+        self.lengths = []
+        self.doc_freq = Counter()
+
+    def __len__(self):
+        return len(self.term_counts)
+
+    def add(self, text):
+        counts = Counter(tokenize(text))
+        self.term_counts.append(counts)
+        self.lengths.append(sum(counts.values()))
+        self.doc_freq.update(counts.keys())
+
+    def search(self, query, top_k, limit=None):
+        """Best (doc_id, score) pairs among the first `limit` documents, highest score first."""
+        limit = len(self) if limit is None else limit
+        if not limit:
+            return []
+        average_length = sum(self.lengths) / len(self) or 1
+        scores = []
+        terms = set(tokenize(query))
+        for doc_id in range(limit):
+            counts = self.term_counts[doc_id]
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / average_length)
+            score = 0.0
+            for term in terms:
+                frequency = counts.get(term)
+                if frequency:
+                    idf = math.log(1 + (len(self) - self.doc_freq[term] + 0.5) / (self.doc_freq[term] + 0.5))
+                    score += idf * frequency * (self.k1 + 1) / (frequency + norm)
+            if score > 0:
+                scores.append((doc_id, score))
+        scores.sort(key=lambda pair: -pair[1])
+        return scores[:top_k]
+
+
+def role_name(message):
+    return "User" if message["role"] == "user" else "Assistant"
+
+
+def compress_message(message, limit=200):
+    """One-line digest of a message; long markdown reports are reduced to their headings."""
+    content = message["content"]
+    matches = re.findall(r"^\s*(?:#+\s*(.+)|\*\*(.+?)\*\*)", content, re.M)
+    headings = [(markdown_heading or bold_heading).strip(" *#:") for markdown_heading, bold_heading in matches]
+    if message["role"] != "user" and len(headings) > 1:
+        text = "covered " + "; ".join(headings)
+    else:
+        text = " ".join(content.split())
+    if len(text) > limit:
+        text = text[:limit].rstrip() + "…"
+    return f"- {role_name(message)}: {text}"
+
+
+def local_summarizer(summary, messages, token_limit):
+    """Appends a digest line per message and drops the oldest lines once over the limit."""
+    lines = (summary.splitlines() if summary else []) + [compress_message(message) for message in messages]
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > token_limit:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class ConversationMemory:
+    """Token-budgeted memory block for one chat.
+
+    `summarizer(summary, messages, token_limit)` returns the updated summary
+    after folding in `messages`; it defaults to a local extractive digest.
+    Up to `retrieval_top_k` older messages most relevant to the query are
+    added back verbatim within `retrieval_share` of the budget. The rendered
+    block is cached until the history or the query changes.
+    """
+
+    def __init__(self, token_budget=2000, summarizer=None, summary_share=0.3, retrieval_share=0.3, retrieval_top_k=4):
+        self.token_budget = token_budget
+        self.summarizer = summarizer or local_summarizer
+        self.summary_limit = int(token_budget * summary_share)
+        self.retrieval_limit = int(token_budget * retrieval_share)
+        self.retrieval_top_k = retrieval_top_k
+        self.reset()
+
+    def reset(self):
+        self.summary = ""
+        self.summarized = 0
+        self.index = BM25Index()
+        self._rendered_key = None
+        self._rendered = ""
+
+    def forget(self, messages, count):
+        """Prepares for the first `count` of `messages` being dropped from the history.
+
+        They are folded into the summary if they are not already, and retrieval
+        only covers the messages that remain.
+        """
+        count = min(count, len(messages))
+        if count <= 0:
+            return
+        if count > self.summarized:
+            self.summary = self.summarizer(self.summary, messages[self.summarized:count], self.summary_limit)
+            self.summarized = count
+        self.summarized -= count
+        self.index = BM25Index()
+        for message in messages[count:]:
+            self.index.add(message["content"])
+        self._rendered_key = None
+
+    def retrieve(self, messages, query, limit):
+        """Chronological (position, text) of older messages relevant to `query`, within the retrieval budget."""
+        selected = {}
+        used = 0
+        for doc_id, _ in self.index.search(query, self.retrieval_top_k, limit):
+            # bring back the whole question/answer pair around a hit
+            partner = doc_id + 1 if messages[doc_id]["role"] == "user" else doc_id - 1
+            for position in (doc_id, partner):
+                if position in selected or not 0 <= position < limit:
+                    continue
+                text = f"{role_name(messages[position])}: {messages[position]['content']}"
+                remaining = self.retrieval_limit - used
+                if remaining <= 0:
+                    break
+                if estimate_tokens(text) > remaining:
+                    text = text[:remaining * 4].rstrip() + "…"
+                selected[position] = text
+                used += estimate_tokens(text)
+        return sorted(selected.items())
+
+    def recent_start(self, messages, budget):
+        """Position of the oldest unsummarized message that still fits in `budget` tokens, counting back from the newest."""
+        start = len(messages)
+        used = 0
+        while start > self.summarized:
+            cost = estimate_tokens(f"{role_name(messages[start - 1])}: {messages[start - 1]['content']}")
+            # the newest message is always kept verbatim
+            if used + cost > budget and start < len(messages):
+                break
+            used += cost
+            start -= 1
+        return start
+
+    def render(self, messages, query=None):
+        if len(messages) <= 1:
+            return ""
+        query = query if query is not None else next(
+            (message["content"] for message in reversed(messages) if message["role"] == "user"), "")
+        key = (len(messages), messages[-1]["content"], query)
+        if key == self._rendered_key:
+            return self._rendered
+        if len(messages) < len(self.index):
+            # history was cleared or truncated
+            self.reset()
+        for message in messages[len(self.index):]:
+            self.index.add(message["content"])
+
+        available = self.token_budget - self.retrieval_limit
+        start = self.recent_start(messages, available - estimate_tokens(self.summary))
+        if start > self.summarized:
+            # older messages are folded in, so leave room for the summary to grow to its limit
+            start = self.recent_start(messages, available - max(self.summary_limit, estimate_tokens(self.summary)))
+            self.summary = self.summarizer(self.summary, messages[self.summarized:start], self.summary_limit)
+            self.summarized = start
+        relevant = self.retrieve(messages, query, start)
+
+        memory_context = "\n\nPREVIOUS CONVERSATION CONTEXT:\n"
+        if self.summary:
+            memory_context += f"Summary of earlier conversation:\n{self.summary}\n\n"
+        if relevant:
+            memory_context += "Earlier messages relevant to the current question:\n"
+            memory_context += "".join(f"{text}\n" for _, text in relevant) + "\n"
+        if self.summary or relevant:
+            memory_context += "Recent messages:\n"
+        memory_context += "".join(f"{role_name(message)}: {message['content']}\n" for message in messages[start:])
+        memory_context += "\nEND OF PREVIOUS CONVERSATION CONTEXT\n"
+        memory_context += "Please use this context to provide more relevant and personalized responses. Reference previous discussions when appropriate.\n\n"
+
+        self._rendered_key = key
+        self._rendered = memory_context
+        return memory_context
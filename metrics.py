@@ -0,0 +1,155 @@
+#---stage timings and counters
+# Spans time each stage of a turn (scrape, profile context, classification, prompt build, generation,
+# render) and counters track cache hits and token usage. Everything is kept in memory for the sidebar
+# debug panel and can be exported as JSON lines or in the Prometheus text format; with METRICS_LOG_PATH
+# set, every finished span is also appended to that file.
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from config import get_setting
+
+PROMETHEUS_PREFIX = "linkedin_optimizer"
+
+
+def _labels_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _quantile(values, q):
+    return values[int(q * (len(values) - 1))] if values else 0.0
+
+
+def _prometheus_labels(labels):
+    if not labels:
+        return ""
+    escaped = (name + '="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"' for name, value in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+class Metrics:
+    """Thread-safe registry of stage spans and labelled counters."""
+
+    def __init__(self, max_events=1000, samples_per_stage=500, log_path=None):
+        self.log_path = log_path
+        self._events = deque(maxlen=max_events)
+        self._stages = {}
+        self._counters = {}
+        self._samples_per_stage = samples_per_stage
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage, **attributes):
+        """Times the enclosed block as one `stage` event.
+
+        Yields the event's attribute dict, so the block can add details such as
+        token counts or a cache hit. An exception marks the span as an error;
+        a closed generator or a Streamlit rerun only marks it as cancelled.
+        """
+        started = time.time()
+        clock = time.monotonic()
+        error = None
+        try:
+            yield attributes
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        except BaseException:
+            attributes["cancelled"] = True
+            raise
+        finally:
+            self._finish(stage, started, time.monotonic() - clock, error, attributes)
+
+    def _finish(self, stage, started, duration, error, attributes):
+        event = {"stage": stage, "start": round(started, 3), "duration": round(duration, 4), **attributes}
+        if error:
+            event["error"] = error
+        with self._lock:
+            entry = self._stages.setdefault(stage, {"count": 0, "errors": 0, "total": 0.0, "samples": deque(maxlen=self._samples_per_stage)})
+            entry["count"] += 1
+            entry["errors"] += bool(error)
+            entry["total"] += duration
+            entry["samples"].append(duration)
+            self._events.append(event)
+            if self.log_path:
+                try:
+                    with open(self.log_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(event, default=str) + "\n")
+                except OSError as e:
+                    print(f"Failed to write metrics log: {e}")
+
+    def reset(self, max_events=None):
+        """Drops every recorded span and counter, optionally resizing the event buffer."""
+        with self._lock:
+            self._events = deque(maxlen=max_events or self._events.maxlen)
+            self._stages = {}
+            self._counters = {}
+
+    def count(self, name, value=1, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def stage_stats(self):
+        """{stage: {"count", "errors", "avg", "p50", "p95", "max"}} over the recent samples of each stage."""
+        with self._lock:
+            stages = {stage: (entry["count"], entry["errors"], entry["total"], sorted(entry["samples"])) for stage, entry in self._stages.items()}
+        return {
+            stage: {
+                "count": count,
+                "errors": errors,
+                "avg": total / count if count else 0.0,
+                "p50": _quantile(samples, 0.5),
+                "p95": _quantile(samples, 0.95),
+                "max": samples[-1] if samples else 0.0,
+            }
+            for stage, (count, errors, total, samples) in stages.items()
+        }
+
+    def counters(self):
+        """{(name, ((label, value), ...)): total}"""
+        with self._lock:
+            return dict(self._counters)
+
+    def events(self, limit=None):
+        """The most recent span events, oldest first."""
+        with self._lock:
+            events = list(self._events)
+        return events[-limit:] if limit else events
+
+    def to_jsonl(self):
+        return "".join(json.dumps(event, default=str) + "\n" for event in self.events())
+
+    def to_prometheus(self, prefix=PROMETHEUS_PREFIX):
+        lines = [f"# TYPE {prefix}_stage_seconds summary"]
+        stages = self.stage_stats()
+        with self._lock:
+            totals = {stage: entry["total"] for stage, entry in self._stages.items()}
+        for stage, stats in sorted(stages.items()):
+            labels = (("stage", stage),)
+            for q in ("0.5", "0.95"):
+                lines.append(f"{prefix}_stage_seconds{_prometheus_labels(labels + (('quantile', q),))} {stats['p50' if q == '0.5' else 'p95']:.6f}")
+            lines.append(f"{prefix}_stage_seconds_sum{_prometheus_labels(labels)} {totals[stage]:.6f}")
+            lines.append(f"{prefix}_stage_seconds_count{_prometheus_labels(labels)} {stats['count']}")
+        lines.append(f"# TYPE {prefix}_stage_errors_total counter")
+        for stage, stats in sorted(stages.items()):
+            lines.append(f"{prefix}_stage_errors_total{_prometheus_labels((('stage', stage),))} {stats['errors']}")
+        counters = self.counters()
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            for (counter, labels), value in sorted(counters.items()):
+                if counter == name:
+                    lines.append(f"{prefix}_{name}_total{_prometheus_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """Writes the Prometheus text format to a .prom/.txt path and JSON lines otherwise."""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus() if path.endswith((".prom", ".txt")) else self.to_jsonl())
+
+
+metrics = Metrics(
+    max_events=get_setting("METRICS_MAX_EVENTS", 1000, int),
+    log_path=get_setting("METRICS_LOG_PATH"),
+)
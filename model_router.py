@@ -0,0 +1,93 @@
+#---model tiering
+# Picks the Gemini model for each task (handler, classification, context extraction, ...) and
+# experience level, names the stronger model to retry with when an output fails validation, and
+# keeps per-model latency and token counts.
+import json
+import threading
+from config import get_setting
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+# a task maps to a model name, or to {experience level: model} with an optional "default"
+DEFAULT_ROUTES = {
+    "classification": "gemini-2.0-flash-lite",
+    "profile_context": "gemini-2.0-flash-lite",
+    "memory_summary": "gemini-2.0-flash-lite",
+    "general_prompt_handler": "gemini-2.0-flash-lite",
+    "job_fit_score": "gemini-2.0-flash-lite",
+    "content_rewrite_or_generation": DEFAULT_MODEL,
+    "profile_analysis": {"senior": "gemini-2.5-flash", "default": DEFAULT_MODEL},
+    "job_fit_analysis": DEFAULT_MODEL,
+    "career_counseling_skill_gap_analysis": DEFAULT_MODEL,
+    "router": DEFAULT_MODEL,
+}
+# weakest to strongest
+DEFAULT_ESCALATION = ("gemini-2.0-flash-lite", "gemini-2.0-flash", "gemini-2.5-flash")
+
+
+class ModelRouter:
+    def __init__(self, routes=None, escalation=DEFAULT_ESCALATION, default=DEFAULT_MODEL):
+        self.routes = {**DEFAULT_ROUTES, **(routes or {})}
+        self.escalation = list(escalation)
+        self.default = default
+
+    def model_for(self, task, experience_level=None):
+        route = self.routes.get(task, self.default)
+        if isinstance(route, dict):
+            level = (experience_level or "").strip().lower()
+            return route.get(level) or route.get("default") or self.default
+        return route
+
+    def escalate(self, model):
+        """The next stronger model after `model`, or None if there is none."""
+        if model not in self.escalation:
+            return None
+        position = self.escalation.index(model) + 1
+        return self.escalation[position] if position < len(self.escalation) else None
+
+
+class ModelUsage:
+    """Per-model call counts, latency and token usage, shared by every session."""
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, model):
+        return self._models.setdefault(model, {
+            "calls": 0, "errors": 0, "escalations": 0, "latency": 0.0, "input_tokens": 0, "output_tokens": 0,
+        })
+
+    def record(self, model, latency, input_tokens=None, output_tokens=None, error=False):
+        with self._lock:
+            entry = self._entry(model)
+            entry["calls"] += 1
+            entry["errors"] += bool(error)
+            entry["latency"] += latency
+            entry["input_tokens"] += input_tokens or 0
+            entry["output_tokens"] += output_tokens or 0
+
+    def record_escalation(self, model):
+        """Counts an output of `model` that failed validation and was retried on a stronger model."""
+        with self._lock:
+            self._entry(model)["escalations"] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                model: {**entry, "avg_latency": entry["latency"] / entry["calls"] if entry["calls"] else 0.0}
+                for model, entry in self._models.items()
+            }
+
+
+def _routes_setting():
+    routes = get_setting("MODEL_ROUTES")
+    if isinstance(routes, str):
+        return json.loads(routes)
+    return dict(routes) if routes else None
+
+
+router = ModelRouter(
+    routes=_routes_setting(),
+    escalation=[model.strip() for model in get_setting("MODEL_ESCALATION", ",".join(DEFAULT_ESCALATION)).split(",") if model.strip()],
+)
+model_usage = ModelUsage()
@@ -0,0 +1,111 @@
+#---speculative Quick Action prefetch
+# After a profile is analyzed, the Quick Action answers are generated in the background at low priority,
+# so a click can show its answer at once. Prefetches from every session share one small worker pool,
+# and a session's pending prefetches are cancelled when its profile changes.
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import get_setting
+from handlers import Session, process_user_query, quick_actions
+from metrics import metrics
+from scheduler import admission_hook, scheduler
+
+PREFETCH_ENABLED = get_setting("PREFETCH_QUICK_ACTIONS", False, bool)
+# Quick Actions prefetched per analyzed profile, in button order
+PREFETCH_BUDGET = get_setting("PREFETCH_BUDGET", 6, int)
+# prefetching is skipped while this many Gemini requests are already waiting
+PREFETCH_MAX_QUEUE = get_setting("PREFETCH_MAX_QUEUE", 4, int)
+
+_pool = ThreadPoolExecutor(max_workers=get_setting("PREFETCH_WORKERS", 2, int), thread_name_prefix="prefetch")
+
+
+class PrefetchWithdrawn(BaseException):
+    """Stops a prefetch whose answer is no longer wanted before it takes a Gemini request slot.
+
+    It is a BaseException so the handlers' error reporting lets it through.
+    """
+
+
+class QuickActionPrefetcher:
+    """Background answers to one profile's Quick Actions, keyed by query."""
+
+    def __init__(self, session, budget=PREFETCH_BUDGET):
+        # the worker threads only see this snapshot, never the live session
+        self.session = Session.copy_of(session, priority="background")
+        self.cancelled = threading.Event()
+        self.futures = {}
+        # queries whose prefetch has been admitted by the scheduler, and ones given up on before that
+        self.admitted = set()
+        self.withdrawn = set()
+        self._lock = threading.Lock()
+        for _, query, handler_name in quick_actions(session)[:max(0, budget)]:
+            self.futures[query] = _pool.submit(self._generate, query, handler_name)
+
+    def _generate(self, query, handler_name):
+        if self.cancelled.is_set():
+            return None
+
+        def admit():
+            with self._lock:
+                if self.cancelled.is_set() or query in self.withdrawn:
+                    raise PrefetchWithdrawn(query)
+                self.admitted.add(query)
+
+        with admission_hook(admit), metrics.span("prefetch", handler=handler_name):
+            return process_user_query(self.session, query, handler_name, standalone=True)
+
+    def cancel(self):
+        """Drops queued prefetches; ones waiting for a request slot are withdrawn, and ones already generating finish but are not used."""
+        self.cancelled.set()
+        for future in self.futures.values():
+            if future.cancel():
+                metrics.count("prefetch", result="cancelled")
+
+    def take(self, query):
+        """The prefetched answer to `query`, waiting for it if it is being generated, or None.
+
+        A prefetch still waiting for a worker or for a Gemini request slot is
+        withdrawn, so the click is answered at interactive priority instead of
+        waiting behind interactive traffic for a background request.
+        """
+        future = self.futures.pop(query, None)
+        if future is None or self.cancelled.is_set() or future.cancel():
+            metrics.count("prefetch", result="miss")
+            return None
+        with self._lock:
+            # a prefetch answered from the response cache is done without ever being admitted
+            if query not in self.admitted and not future.done():
+                self.withdrawn.add(query)
+        if query in self.withdrawn:
+            metrics.count("prefetch", result="withdrawn")
+            return None
+        try:
+            answer = future.result()
+        except Exception as e:
+            print(f"Prefetch failed: {e}")
+            answer = None
+        metrics.count("prefetch", result="hit" if answer else "miss")
+        return answer
+
+
+def start_prefetch(session):
+    """Cancels the session's previous prefetch and starts one for its current profile, if enabled."""
+    cancel_prefetch(session)
+    if not PREFETCH_ENABLED or session.profile_context is None:
+        return None
+    if scheduler.stats()["queue_depth"] >= PREFETCH_MAX_QUEUE:
+        metrics.count("prefetch", result="skipped")
+        return None
+    session.prefetcher = QuickActionPrefetcher(session)
+    return session.prefetcher
+
+
+def cancel_prefetch(session):
+    prefetcher = getattr(session, "prefetcher", None)
+    if prefetcher is not None:
+        prefetcher.cancel()
+    session.prefetcher = None
+
+
+def prefetched_answer(session, query):
+    prefetcher = getattr(session, "prefetcher", None)
+    return prefetcher.take(query) if prefetcher is not None else None
@@ -0,0 +1,93 @@
+#---structured profile
+# Parsed sections of a scraped profile. Prompt builders render only the sections they need,
+# and each rendered combination is memoized on the instance. Section fingerprints tell which
+# sections changed between two scrapes of the same profile.
+import hashlib
+
+SECTIONS = ("name", "headline", "about", "network", "location", "skills", "experience", "education")
+
+
+class Profile:
+    __slots__ = ("url", "name", "headline", "about", "connections", "followers", "country", "company_size",
+                 "skills", "experiences", "educations", "_fragments", "_fingerprints")
+
+    def __init__(self, name=None, headline=None, about="—", connections="—", followers="—", country="—",
+                 company_size="—", skills=(), experiences=(), educations=(), url=None):
+        self.url = url
+        self.name = name
+        self.headline = headline
+        self.about = about
+        self.connections = connections
+        self.followers = followers
+        self.country = country
+        self.company_size = company_size
+        self.skills = tuple(skills)
+        self.experiences = tuple(experiences)
+        self.educations = tuple(educations)
+        self._fragments = {}
+        self._fingerprints = None
+
+    @classmethod
+    def from_item(cls, item):
+        """Builds a Profile from a raw Apify dataset item."""
+        return cls(
+            name=item.get("fullName"),
+            headline=item.get("headline"),
+            about=item.get("about", "—"),
+            connections=item.get("connections", "—"),
+            followers=item.get("followers", "—"),
+            country=item.get("addressCountryOnly", "—"),
+            company_size=item.get("companySize", "—"),
+            skills=item.get("skills") or (),
+            experiences=((exp.get("title"), exp.get("subtitle"), exp.get("caption")) for exp in item.get("experiences") or ()),
+            educations=((edu.get("title"), edu.get("caption", "")) for edu in item.get("educations") or ()),
+            url=item.get("linkedinUrl") or item.get("url") or item.get("inputUrl"),
+        )
+
+    def _render_section(self, section):
+        if section == "name":
+            return [f"Name: {self.name}"]
+        if section == "headline":
+            return [f"Headline: {self.headline}"]
+        if section == "about":
+            return [f"About: {self.about}"]
+        if section == "network":
+            return [f"Connections: {self.connections}", f"Followers: {self.followers}"]
+        if section == "location":
+            return [f"Country: {self.country}", f"CurrentEmploymentSize: {self.company_size}"]
+        if section == "skills":
+            return ["Skills:"] + ([f"   - {skill}" for skill in self.skills] or ["   - —"])
+        if section == "experience":
+            return [" Experience:"] + ([f"   - {title} at {subtitle} ({caption})" for title, subtitle, caption in self.experiences]
+                                       or ["   - No experience listed."])
+        if section == "education":
+            return ["Education:"] + ([f"   - {title} ({caption})" for title, caption in self.educations]
+                                     or ["   - No education listed."])
+        raise ValueError(f"Unknown profile section: {section}")
+
+    def render(self, sections=SECTIONS):
+        """Text of the given sections, in profile order; the full render matches the scrape summary."""
+        key = tuple(section for section in SECTIONS if section in sections)
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            fragment = "\n".join(line for section in key for line in self._render_section(section))
+            self._fragments[key] = fragment
+        return fragment
+
+    def fragments(self):
+        """Every text rendered so far."""
+        return list(self._fragments.values())
+
+    def fingerprints(self):
+        """{section: hash of its rendered text}"""
+        if self._fingerprints is None:
+            self._fingerprints = {
+                section: hashlib.sha256("\n".join(self._render_section(section)).encode("utf-8")).hexdigest()[:16]
+                for section in SECTIONS
+            }
+        return self._fingerprints
+
+    def changed_sections(self, other):
+        """Sections whose text differs from `other`, an earlier scrape of the same profile."""
+        fingerprints = other.fingerprints()
+        return {section for section, fingerprint in self.fingerprints().items() if fingerprints.get(section) != fingerprint}
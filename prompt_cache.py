@@ -0,0 +1,73 @@
+#---Gemini context caching for the per-profile prompt prefix
+import hashlib
+import time
+from google.genai import types
+from memory import estimate_tokens
+
+
+class PromptPrefixCache:
+    """Registers the static prompt prefix of one analyzed profile as Gemini cached content.
+
+    Prompts that start with the registered prefix are sent as the remaining
+    text plus a reference to the cached content; anything else is sent as is.
+    Prefixes below `min_tokens` are not cached, since the API rejects them.
+    """
+
+    def __init__(self, client, model, ttl=3600, min_tokens=4096, enabled=True):
+        self.client = client
+        self.model = model
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.enabled = enabled
+        self.prefix = None
+        self.name = None
+        self.expires_at = 0.0
+
+    @property
+    def active(self):
+        return self.name is not None and time.monotonic() < self.expires_at
+
+    def register(self, prefix):
+        """Caches `prefix`, replacing any previous one; returns whether it is now cached."""
+        if self.active and prefix == self.prefix:
+            return True
+        self.invalidate()
+        if not self.enabled or estimate_tokens(prefix) < self.min_tokens:
+            return False
+        try:
+            cached = self.client.caches.create(
+                model=self.model,
+                config=types.CreateCachedContentConfig(
+                    contents=[prefix],
+                    ttl=f"{int(self.ttl)}s",
+                    display_name=f"profile-{hashlib.sha256(prefix.encode('utf-8')).hexdigest()[:12]}",
+                ),
+            )
+        except Exception as e:
+            print(f"Prompt prefix caching failed: {e}")
+            return False
+        self.prefix = prefix
+        self.name = cached.name
+        # stop referencing the cache a little before the server expires it
+        self.expires_at = time.monotonic() + self.ttl - 60
+        return True
+
+    def invalidate(self):
+        if self.name is not None:
+            try:
+                self.client.caches.delete(name=self.name)
+            except Exception as e:
+                print(f"Failed to delete cached content {self.name}: {e}")
+        self.prefix = None
+        self.name = None
+        self.expires_at = 0.0
+
+    def request(self, prompt, model, config=None):
+        """Returns (contents, config) for generate_content, adding the cache reference to `config`."""
+        if self.active and model == self.model and prompt.startswith(self.prefix):
+            if config is None:
+                config = types.GenerateContentConfig(cached_content=self.name)
+            else:
+                config = config.model_copy(update={"cached_content": self.name})
+            return prompt[len(self.prefix):], config
+        return prompt, config
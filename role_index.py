@@ -0,0 +1,138 @@
+#---local role matching
+# Scores a profile against every role in role_taxonomy.json without a network call. Skills and
+# title words are indexed once into role x term matrices, so scoring all roles is a few NumPy
+# matrix-vector products.
+import json
+import os
+import re
+from collections import namedtuple
+
+import numpy as np
+
+TAXONOMY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "role_taxonomy.json")
+# seniority words say little about which role someone fits
+TITLE_STOPWORDS = {"and", "of", "the", "at", "senior", "junior", "lead", "principal", "head", "associate", "sr", "jr", "intern"}
+SKILL_WEIGHT = 0.7
+TITLE_WEIGHT = 0.3
+# a job title resembles a role only when they share more than half of their combined words,
+# so "Prompt Engineer" is not taken for "Principal Engineer"
+MIN_TITLE_SIMILARITY = 0.5
+
+RoleMatch = namedtuple("RoleMatch", "title industry score coverage title_similarity matched_skills missing_skills")
+
+
+def normalize_skill(skill):
+    """Lowercased skill name without parentheticals; Apify items may hold strings or dicts."""
+    if isinstance(skill, dict):
+        skill = skill.get("title") or skill.get("name") or ""
+    skill = re.sub(r"\(.*?\)", " ", str(skill).lower())
+    return " ".join(re.findall(r"[a-z0-9+#/.&-]+", skill)).strip(" .-")
+
+
+def title_tokens(title):
+    return {word for word in re.findall(r"[a-z0-9+#]+", str(title or "").lower()) if word not in TITLE_STOPWORDS}
+
+
+class RoleIndex:
+    """Inverted index from skills and title words to the taxonomy roles that use them.
+
+    Column j of `skill_matrix` marks the roles that list skill j, and likewise
+    for `title_matrix`, so a profile's binary term vector scores every role
+    at once.
+    """
+
+    def __init__(self, taxonomy):
+        self.roles = [(title, industry, [normalize_skill(skill) for skill in skills])
+                      for industry, roles in taxonomy.items() for title, skills in roles.items()]
+        self.skill_ids = {}
+        self.title_ids = {}
+        for title, _, skills in self.roles:
+            for skill in skills:
+                self.skill_ids.setdefault(skill, len(self.skill_ids))
+            for word in title_tokens(title):
+                self.title_ids.setdefault(word, len(self.title_ids))
+        self.skill_matrix = np.zeros((len(self.roles), len(self.skill_ids)), dtype=np.float32)
+        self.title_matrix = np.zeros((len(self.roles), len(self.title_ids)), dtype=np.float32)
+        for row, (title, _, skills) in enumerate(self.roles):
+            self.skill_matrix[row, [self.skill_ids[skill] for skill in skills]] = 1
+            self.title_matrix[row, [self.title_ids[word] for word in title_tokens(title)]] = 1
+        self.role_sizes = np.maximum(self.skill_matrix.sum(axis=1), 1)
+        self.title_sizes = np.maximum(self.title_matrix.sum(axis=1), 1)
+
+    @classmethod
+    def from_file(cls, path=TAXONOMY_PATH):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def __len__(self):
+        return len(self.roles)
+
+    def _skill_vector(self, skills):
+        vector = np.zeros(len(self.skill_ids), dtype=np.float32)
+        ids = [self.skill_ids[skill] for skill in map(normalize_skill, skills) if skill in self.skill_ids]
+        vector[ids] = 1
+        return vector
+
+    def _title_vector(self, titles):
+        vector = np.zeros(len(self.title_ids), dtype=np.float32)
+        ids = [self.title_ids[word] for title in titles for word in title_tokens(title) if word in self.title_ids]
+        vector[ids] = 1
+        return vector
+
+    def scores(self, skills, titles=()):
+        """(score, coverage, title similarity) arrays over all roles for the given skills and experience titles.
+
+        Coverage is the share of a role's skills the profile lists; title
+        similarity is the share of the role's title words found in any
+        experience title. The score blends both on a 0-100 scale.
+        """
+        skill_vector = self._skill_vector(skills)
+        coverage = self.skill_matrix @ skill_vector / self.role_sizes
+        title_similarity = self.title_matrix @ self._title_vector(titles) / self.title_sizes
+        return 100 * (SKILL_WEIGHT * coverage + TITLE_WEIGHT * title_similarity), coverage, title_similarity
+
+    def _match(self, row, scores, coverage, title_similarity, known):
+        title, industry, role_skills = self.roles[row]
+        return RoleMatch(
+            title=title,
+            industry=industry,
+            score=int(round(float(scores[row]))),
+            coverage=float(coverage[row]),
+            title_similarity=float(title_similarity[row]),
+            matched_skills=[skill for skill in role_skills if skill in known],
+            missing_skills=[skill for skill in role_skills if skill not in known],
+        )
+
+    def rank(self, skills, titles=(), top_k=10, industry=None):
+        """Best `top_k` RoleMatch results, optionally limited to one industry."""
+        scores, coverage, title_similarity = self.scores(skills, titles)
+        if industry is not None:
+            in_industry = np.array([role_industry == industry for _, role_industry, _ in self.roles])
+            if in_industry.any():
+                scores = np.where(in_industry, scores, -1)
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        known = set(map(normalize_skill, skills))
+        return [self._match(row, scores, coverage, title_similarity, known) for row in order if scores[row] >= 0]
+
+    def find_role(self, job_title):
+        """Index of the taxonomy role whose title best matches `job_title`, or None when none is similar enough."""
+        words = title_tokens(job_title)
+        vector = self._title_vector([job_title])
+        if not vector.any():
+            return None
+        # Jaccard similarity between the job title words and each role title; words no role uses still count
+        shared = self.title_matrix @ vector
+        similarity = shared / (self.title_sizes + len(words) - shared)
+        best = int(np.argmax(similarity))
+        return best if similarity[best] > MIN_TITLE_SIMILARITY else None
+
+    def estimate(self, job_title, skills, titles=()):
+        """RoleMatch for the taxonomy role closest to `job_title`, or None when no role resembles it."""
+        row = self.find_role(job_title)
+        if row is None:
+            return None
+        scores, coverage, title_similarity = self.scores(skills, titles)
+        return self._match(row, scores, coverage, title_similarity, set(map(normalize_skill, skills)))
+
+
+role_index = RoleIndex.from_file()
@@ -0,0 +1,152 @@
+#---Gemini request scheduler
+# Every Gemini request in the process waits here for a turn: requests are admitted in priority order,
+# at most `max_concurrency` at a time, and only while the per-minute request and token budgets allow.
+# Under load, requests queue up instead of all failing with rate-limit errors together.
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from config import get_setting
+
+# interactive chat is served before background work (e.g. prefetched quick actions) and batch runs
+PRIORITIES = ("interactive", "background", "batch")
+
+_admission = threading.local()
+
+
+@contextmanager
+def admission_hook(hook):
+    """Calls `hook()` just before each request made from this thread is admitted.
+
+    The hook runs under the scheduler lock, so it must be quick; raising from
+    it withdraws the request from the queue without sending it.
+    """
+    previous = getattr(_admission, "hook", None)
+    _admission.hook = hook
+    try:
+        yield
+    finally:
+        _admission.hook = previous
+
+
+class TokenBucket:
+    """Budget of `per_minute` units that refills continuously; not thread-safe on its own."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` units are available (requests larger than the bucket wait for a full one)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        # may go below zero when a response used more than was reserved for it
+        self.level -= amount
+
+
+class RequestScheduler:
+    """Priority queue in front of the Gemini API with token-bucket rate limits and a concurrency cap."""
+
+    def __init__(self, requests_per_minute=1000, tokens_per_minute=1_000_000, max_concurrency=16):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.completed = 0
+        self._queue = []
+        self._counter = itertools.count()
+        self._waits = deque(maxlen=1000)
+        self._cond = threading.Condition()
+
+    def acquire(self, tokens, priority="interactive", timeout=None):
+        """Blocks until the request may be sent; raises TimeoutError after `timeout` seconds in the queue."""
+        ticket = (PRIORITIES.index(priority), next(self._counter))
+        enqueued = time.monotonic()
+        deadline = None if timeout is None else enqueued + timeout
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self._queue[0] == ticket and self.in_flight < self.max_concurrency:
+                        wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+                        if wait <= 0:
+                            hook = getattr(_admission, "hook", None)
+                            if hook is not None:
+                                hook()
+                            break
+                    else:
+                        wait = None
+                    if deadline is not None:
+                        if now >= deadline:
+                            raise TimeoutError(f"Timed out after {timeout:g}s waiting for a Gemini request slot")
+                        wait = deadline - now if wait is None else min(wait, deadline - now)
+                    self._cond.wait(wait)
+            except BaseException:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+                raise
+            heapq.heappop(self._queue)
+            self.in_flight += 1
+            self.requests.take(1)
+            self.tokens.take(min(tokens, self.tokens.capacity))
+            self._waits.append(time.monotonic() - enqueued)
+            # the next request in line may be admissible too
+            self._cond.notify_all()
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self.completed += 1
+            self._cond.notify_all()
+
+    def settle(self, reserved_tokens, used_tokens):
+        """Charges the difference once a response reports how many tokens it actually used."""
+        if used_tokens is None:
+            return
+        with self._cond:
+            self.tokens.take(used_tokens - min(reserved_tokens, self.tokens.capacity))
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, tokens, priority="interactive", timeout=None):
+        self.acquire(tokens, priority, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        with self._cond:
+            waits = sorted(self._waits)
+            queued = {priority: 0 for priority in PRIORITIES}
+            for rank, _ in self._queue:
+                queued[PRIORITIES[rank]] += 1
+            return {
+                "queue_depth": len(self._queue),
+                "queued": queued,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "avg_wait": sum(waits) / len(waits) if waits else 0.0,
+                "p95_wait": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+                "max_wait": waits[-1] if waits else 0.0,
+            }
+
+
+scheduler = RequestScheduler(
+    requests_per_minute=get_setting("GEMINI_REQUESTS_PER_MINUTE", 1000, float),
+    tokens_per_minute=get_setting("GEMINI_TOKENS_PER_MINUTE", 1_000_000, float),
+    max_concurrency=get_setting("GEMINI_MAX_CONCURRENCY", 16, int),
+)
@@ -1,49 +1,176 @@
 #---impoerting necessary libraries
-from apify_client import ApifyClient
-import streamlit as st
-#---setting up Apify API key
-APIFY_API_KEY_ = st.secrets["APIFY_API_KEY"]
-def get_profile(linkedin_url):
+import time
+from urllib.parse import urlparse
+from cache import ProfileCache, SingleFlight
+from clients import get_apify_client
+from config import get_setting
+from metrics import metrics
+from profile_model import Profile
+#---actor settings
+ACTOR_ID = "2SyF0bVxmgGr8IVCZ"
+BATCH_CHUNK_SIZE = get_setting("APIFY_BATCH_CHUNK_SIZE", 50, int)
+ACTOR_TIMEOUT = get_setting("APIFY_ACTOR_TIMEOUT", 180, float)
+POLL_INTERVAL = get_setting("APIFY_POLL_INTERVAL", 2, int)
+#---on-disk profile cache shared by every session
+profile_cache = ProfileCache(
+    get_setting("PROFILE_CACHE_PATH", ".profile_cache.sqlite3"),
+    ttl=get_setting("PROFILE_CACHE_TTL", 24 * 3600, float),
+    max_entries=get_setting("PROFILE_CACHE_MAX_ENTRIES", 500, int),
+)
+#---actor runs in flight, keyed by normalized URL
+scrape_flights = SingleFlight()
+
+def normalize_linkedin_url(linkedin_url):
+    """Canonical form of a profile URL, e.g. https://www.linkedin.com/in/username"""
+    url = linkedin_url.strip()
+    if "://" not in url:
+        url = "https://" + url
+    parsed = urlparse(url)
+    path = parsed.path.rstrip("/")
+    parts = [part for part in path.split("/") if part]
+    if len(parts) >= 2 and parts[0].lower() == "in":
+        return f"https://www.linkedin.com/in/{parts[1].lower()}"
+    return f"https://{parsed.netloc.lower()}{path}"
+
+def _profile_key(profile):
+    """Normalized URL of a dataset item, used to match it back to the requested URL"""
+    url = profile.get("linkedinUrl") or profile.get("url") or profile.get("inputUrl")
+    if url:
+        return normalize_linkedin_url(url)
+    if profile.get("publicIdentifier"):
+        return normalize_linkedin_url(f"linkedin.com/in/{profile['publicIdentifier']}")
+    return None
+
+def summarize_profile(profile):
+    return Profile.from_item(profile).render()
+
+class ScrapeCancelled(Exception):
+    pass
+
+def run_actor(client, run_input, timeout=None, on_status=None, cancel_event=None):
+    """Start the actor and poll it, yielding dataset items as soon as they are written.
+
+    `on_status(status, message)` is called on every poll. The run is aborted
+    when the deadline passes, when `cancel_event` is set, or when the caller
+    stops iterating before the run has finished.
+    """
+    if cancel_event is not None and cancel_event.is_set():
+        raise ScrapeCancelled("Scrape cancelled")
+    timeout = timeout or ACTOR_TIMEOUT
+    deadline = time.monotonic() + timeout
+    run = client.actor(ACTOR_ID).start(run_input=run_input, timeout_secs=max(1, int(timeout)))
+    run_client = client.run(run["id"])
+    dataset = client.dataset(run["defaultDatasetId"])
+    offset = 0
+    finished = False
     try:
-        client = ApifyClient(APIFY_API_KEY_)
-        run_input = { "profileUrls": [linkedin_url] }
-        run = client.actor("2SyF0bVxmgGr8IVCZ").call(run_input=run_input)
-        for profile in client.dataset(run["defaultDatasetId"]).iterate_items():
-            summary_parts = []
-
-            summary_parts.append(f"Name: {profile.get('fullName')}")
-            summary_parts.append(f"Headline: {profile.get('headline')}")
-            summary_parts.append(f"About: {profile.get('about', '—')}")
-            summary_parts.append(f"Connections: {profile.get('connections', '—')}")
-            summary_parts.append(f"Followers: {profile.get('followers', '—')}")
-            summary_parts.append(f"Country: {profile.get('addressCountryOnly', '—')}")
-            summary_parts.append(f"CurrentEmploymentSize: {profile.get('companySize', '—')}")
-            skills = profile.get("skills", [])
-            summary_parts.append("Skills:")
-            if skills:
-                for skill in skills:
-                    summary_parts.append(f"   - {skill}")
-            else:
-                summary_parts.append("   - —")
-
-            experiences = profile.get("experiences", [])
-            summary_parts.append(" Experience:")
-            if experiences:
-                for exp in experiences:
-                    summary_parts.append(f"   - {exp.get('title')} at {exp.get('subtitle')} ({exp.get('caption')})")
-            else:
-                summary_parts.append("   - No experience listed.")
-
-            educations = profile.get("educations", [])
-            summary_parts.append("Education:")
-            if educations:
-                for edu in educations:
-                    summary_parts.append(f"   - {edu.get('title')} ({edu.get('caption', '')})")
-            else:
-                summary_parts.append("   - No education listed.")
-            print("Profile fetched successfully.")
-            print("\n".join(summary_parts))
-            return "\n".join(summary_parts)
-        return "Error: No profile data found"
-    except Exception as e:
-        return f"Error: {str(e)}"
\ No newline at end of file
+        while True:
+            status = run.get("status")
+            if on_status:
+                on_status(status, run.get("statusMessage"))
+            # the status is read before listing, so after a terminal status no items can be missed
+            for item in dataset.list_items(offset=offset).items:
+                offset += 1
+                yield item
+            if status not in ("READY", "RUNNING"):
+                finished = True
+                if status != "SUCCEEDED":
+                    raise RuntimeError(f"Actor run ended with status {status}")
+                return
+            if cancel_event is not None and cancel_event.is_set():
+                raise ScrapeCancelled("Scrape cancelled")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"Actor run timed out after {timeout:g}s")
+            run = run_client.wait_for_finish(wait_secs=max(1, int(min(POLL_INTERVAL, remaining)))) or run_client.get()
+    finally:
+        if not finished:
+            try:
+                run_client.abort()
+            except Exception as e:
+                print(f"Failed to abort actor run {run['id']}: {e}")
+
+def _scrape_profile(linkedin_url, cache_key, timeout, on_status, cancel_event):
+    client = get_apify_client()
+    run_input = { "profileUrls": [linkedin_url] }
+    for profile in run_actor(client, run_input, timeout, on_status, cancel_event):
+        summary = summarize_profile(profile)
+        profile_cache.put(cache_key, profile, summary)
+        return profile, summary
+    return None, "Error: No profile data found"
+
+def get_profile_item(linkedin_url, force_refresh=False, timeout=None, on_status=None, cancel_event=None):
+    """Returns (raw dataset item, summary); on failure the item is None and the summary an error.
+
+    Concurrent calls for the same profile, from any session, share one actor run.
+    """
+    with metrics.span("scrape", force_refresh=force_refresh) as span:
+        profile_item, summary = _get_profile_item(linkedin_url, force_refresh, timeout, on_status, cancel_event, span)
+        span["ok"] = profile_item is not None
+        return profile_item, summary
+
+def _get_profile_item(linkedin_url, force_refresh, timeout, on_status, cancel_event, span):
+    cache_key = normalize_linkedin_url(linkedin_url)
+    if not force_refresh:
+        cached = profile_cache.get(cache_key)
+        span["cache_hit"] = bool(cached)
+        metrics.count("cache_lookups", cache="profile", result="hit" if cached else "miss")
+        if cached:
+            return cached
+    while True:
+        try:
+            return scrape_flights.do(cache_key, lambda: _scrape_profile(linkedin_url, cache_key, timeout, on_status, cancel_event))
+        except ScrapeCancelled as e:
+            if cancel_event is not None and cancel_event.is_set():
+                return None, f"Error: {str(e)}"
+            # another session cancelled the run this call was waiting on, so start a new one
+            cached = profile_cache.get(cache_key)
+            if cached:
+                return cached
+        except Exception as e:
+            return None, f"Error: {str(e)}"
+
+def get_profile(linkedin_url, force_refresh=False, timeout=None, on_status=None, cancel_event=None):
+    return get_profile_item(linkedin_url, force_refresh, timeout, on_status, cancel_event)[1]
+
+def get_profiles(linkedin_urls, force_refresh=False, chunk_size=None, timeout=None, on_status=None, cancel_event=None):
+    """Scrape many profiles with one actor run per chunk of URLs.
+
+    Yields (linkedin_url, item, summary) as soon as each dataset item is written,
+    with the raw item like get_profile_item. Cached profiles are yielded first,
+    duplicate URLs only once, and URLs the actor could not scrape yield a None
+    item and an "Error: ..." summary.
+    """
+    chunk_size = chunk_size or BATCH_CHUNK_SIZE
+    pending = {}
+    seen = set()
+    for linkedin_url in linkedin_urls:
+        cache_key = normalize_linkedin_url(linkedin_url)
+        if cache_key in seen:
+            continue
+        seen.add(cache_key)
+        if not force_refresh:
+            cached = profile_cache.get(cache_key)
+            if cached:
+                yield linkedin_url, *cached
+                continue
+        pending[cache_key] = linkedin_url
+
+    keys = list(pending)
+    client = get_apify_client()
+    for start in range(0, len(keys), chunk_size):
+        chunk = {key: pending[key] for key in keys[start:start + chunk_size]}
+        try:
+            run_input = {"profileUrls": list(chunk.values())}
+            for profile in run_actor(client, run_input, timeout, on_status, cancel_event):
+                cache_key = _profile_key(profile)
+                if cache_key not in chunk:
+                    continue
+                summary = summarize_profile(profile)
+                profile_cache.put(cache_key, profile, summary)
+                yield chunk.pop(cache_key), profile, summary
+            error = "Error: No profile data found"
+        except Exception as e:
+            error = f"Error: {str(e)}"
+        for linkedin_url in chunk.values():
+            yield linkedin_url, None, error
@@ -0,0 +1,218 @@
+#---persistent sessions
+# Keeps each user's analyzed profile and chat history outside the Streamlit process, so a session
+# survives reconnects and server restarts. Only the tail of a history is loaded into memory; older
+# messages are read a page at a time when the user scrolls back, and idle sessions are evicted.
+import importlib
+import json
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+import time
+import zlib
+from config import get_setting
+
+# message and state bodies at least this long are stored zlib-compressed
+COMPRESS_MIN_BYTES = 512
+
+
+def pack(value):
+    data = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return zlib.compress(data) if len(data) >= COMPRESS_MIN_BYTES else data
+
+
+def unpack(data):
+    data = bytes(data)
+    # compressed bodies start with a zlib header, JSON ones with "{" or "["
+    if data[:1] not in (b"{", b"["):
+        data = zlib.decompress(data)
+    return json.loads(data)
+
+
+class SessionStore(ABC):
+    """Interface of a session store; messages are dicts numbered by a per-session `seq` starting at 0."""
+
+    @abstractmethod
+    def load_state(self, session_id):
+        """The state saved by save_state, or None for an unknown or evicted session."""
+        ...
+
+    @abstractmethod
+    def save_state(self, session_id, state):
+        ...
+
+    @abstractmethod
+    def append_message(self, session_id, message):
+        """Stores a message and returns its seq."""
+        ...
+
+    @abstractmethod
+    def update_message(self, session_id, seq, message):
+        ...
+
+    @abstractmethod
+    def load_messages(self, session_id, before=None, limit=20):
+        """Up to `limit` messages older than seq `before` (the newest ones without it), oldest first, each with its "seq"."""
+        ...
+
+    @abstractmethod
+    def clear_messages(self, session_id):
+        ...
+
+    @abstractmethod
+    def evict_idle(self, max_idle):
+        """Deletes sessions untouched for `max_idle` seconds; returns how many were deleted."""
+        ...
+
+
+class SQLiteSessionStore(SessionStore):
+    """Session store in a local SQLite file, shared by every session of the process."""
+
+    def __init__(self, path, idle_ttl=30 * 24 * 3600, evict_interval=3600):
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self.evict_interval = evict_interval
+        self._evicted_at = 0.0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                state BLOB,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS messages (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                body BLOB NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            )"""
+        )
+        self._conn.commit()
+        self._maybe_evict()
+
+    def _touch(self, session_id, now):
+        self._conn.execute(
+            "INSERT INTO sessions (id, updated_at) VALUES (?, ?) ON CONFLICT(id) DO UPDATE SET updated_at = excluded.updated_at",
+            (session_id, now),
+        )
+
+    def _maybe_evict(self):
+        if self.idle_ttl and time.time() - self._evicted_at >= self.evict_interval:
+            self.evict_idle(self.idle_ttl)
+
+    def load_state(self, session_id):
+        with self._lock:
+            row = self._conn.execute("SELECT state FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None:
+                return None
+            self._touch(session_id, time.time())
+            self._conn.commit()
+        return unpack(row[0]) if row[0] is not None else {}
+
+    def save_state(self, session_id, state):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sessions (id, state, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+                (session_id, pack(state), time.time()),
+            )
+            self._conn.commit()
+        self._maybe_evict()
+
+    def append_message(self, session_id, message):
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(seq) FROM messages WHERE session_id = ?", (session_id,)).fetchone()
+            seq = 0 if row[0] is None else row[0] + 1
+            self._conn.execute("INSERT INTO messages (session_id, seq, body) VALUES (?, ?, ?)",
+                               (session_id, seq, pack({key: value for key, value in message.items() if key != "seq"})))
+            self._touch(session_id, time.time())
+            self._conn.commit()
+        self._maybe_evict()
+        return seq
+
+    def update_message(self, session_id, seq, message):
+        with self._lock:
+            self._conn.execute("UPDATE messages SET body = ? WHERE session_id = ? AND seq = ?",
+                               (pack({key: value for key, value in message.items() if key != "seq"}), session_id, seq))
+            self._conn.commit()
+
+    def load_messages(self, session_id, before=None, limit=20):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, body FROM messages WHERE session_id = ? AND seq < ? ORDER BY seq DESC LIMIT ?",
+                (session_id, before if before is not None else 2 ** 62, limit),
+            ).fetchall()
+        return [{**unpack(body), "seq": seq} for seq, body in reversed(rows)]
+
+    def clear_messages(self, session_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def evict_idle(self, max_idle):
+        cutoff = time.time() - max_idle
+        with self._lock:
+            self._evicted_at = time.time()
+            idle = [row[0] for row in self._conn.execute("SELECT id FROM sessions WHERE updated_at < ?", (cutoff,))]
+            for session_id in idle:
+                self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+                self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self._conn.commit()
+        return len(idle)
+
+
+def history_view(total, pages, page_size, max_pages):
+    """Positions [start, end) of a history view reaching `pages` pages back from the newest of `total` messages.
+
+    The view spans at most `max_pages` pages; paging back further slides it
+    toward older messages instead of growing it.
+    """
+    end = max(0, total - max(0, pages - max_pages) * page_size)
+    return max(0, end - min(pages, max_pages) * page_size), end
+
+
+def load_window(store, session_id, loaded, start, end):
+    """Stored messages with seq in [start, end), oldest first, reading only those missing from `loaded`.
+
+    `loaded` holds consecutive messages, such as the previous window.
+    """
+    kept = [message for message in loaded if start <= message["seq"] < end]
+    if not kept:
+        return store.load_messages(session_id, before=end, limit=end - start) if end > start else []
+    first, last = kept[0]["seq"], kept[-1]["seq"] + 1
+    older = store.load_messages(session_id, before=first, limit=first - start) if first > start else []
+    newer = store.load_messages(session_id, before=end, limit=end - last) if end > last else []
+    return older + kept + newer
+
+
+def trim_loaded(history, memory, max_loaded, keep):
+    """Drops all but the newest `keep` messages once `history` holds more than `max_loaded`; returns the dropped ones.
+
+    They are folded into the conversation `memory` first, and can be read back from the store.
+    """
+    if len(history) <= max_loaded:
+        return []
+    drop = len(history) - keep
+    memory.forget(history, drop)
+    dropped = history[:drop]
+    del history[:drop]
+    return dropped
+
+
+def open_session_store():
+    """The store named by SESSION_STORE: "sqlite" (default), "none", or "module.ClassName" of a SessionStore subclass."""
+    kind = get_setting("SESSION_STORE", "sqlite")
+    if kind == "none":
+        return None
+    if kind == "sqlite":
+        return SQLiteSessionStore(
+            get_setting("SESSION_STORE_PATH", ".sessions.sqlite3"),
+            idle_ttl=get_setting("SESSION_IDLE_TTL", 30 * 24 * 3600, float),
+        )
+    module_name, _, class_name = kind.rpartition(".")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+session_store = open_session_store()
@@ -0,0 +1,202 @@
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+import cache
+from cache import ProfileCache, SingleFlight, TTLCache
+
+
+class Clock:
+    """Replaces cache.time so tests can move time forward."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    monotonic = time
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["profile", "ttl"])
+def make_cache(request):
+    if request.param == "profile":
+        return lambda ttl, max_entries: ProfileCache(":memory:", ttl=ttl, max_entries=max_entries)
+    return lambda ttl, max_entries: TTLCache(ttl=ttl, max_entries=max_entries)
+
+
+def put(store, key, value):
+    if isinstance(store, ProfileCache):
+        store.put(key, {"value": value}, f"summary {value}")
+    else:
+        store.put(key, value)
+
+
+def value(store, key):
+    entry = store.get(key)
+    if entry is None or not isinstance(store, ProfileCache):
+        return entry
+    item, summary = entry
+    assert summary == f"summary {item['value']}"
+    return item["value"]
+
+
+def test_entries_expire_after_ttl(clock, make_cache):
+    store = make_cache(ttl=60, max_entries=10)
+    put(store, "a", 1)
+    clock.advance(60)
+    assert value(store, "a") == 1
+    clock.advance(1)
+    assert value(store, "a") is None
+    # expired entries are removed, not just skipped
+    assert len(store) == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock, make_cache):
+    store = make_cache(ttl=3600, max_entries=2)
+    put(store, "a", 1)
+    clock.advance(1)
+    put(store, "b", 2)
+    clock.advance(1)
+    # reading "a" makes "b" the least recently used
+    assert value(store, "a") == 1
+    clock.advance(1)
+    put(store, "c", 3)
+    assert len(store) == 2
+    assert value(store, "b") is None
+    assert value(store, "a") == 1
+    assert value(store, "c") == 3
+
+
+def test_stats_count_hits_and_misses(clock, make_cache):
+    store = make_cache(ttl=60, max_entries=10)
+    assert store.stats() == {"hits": 0, "misses": 0, "size": 0, "hit_rate": 0.0}
+    put(store, "a", 1)
+    value(store, "a")
+    value(store, "a")
+    value(store, "missing")
+    clock.advance(61)
+    value(store, "a")
+    assert store.stats() == {"hits": 2, "misses": 2, "size": 0, "hit_rate": 0.5}
+
+
+def test_invalidate_and_clear(make_cache):
+    store = make_cache(ttl=60, max_entries=10)
+    put(store, "a", 1)
+    put(store, "b", 2)
+    store.invalidate("a")
+    assert value(store, "a") is None and value(store, "b") == 2
+    store.clear()
+    assert len(store) == 0
+
+
+class Interrupted(BaseException):
+    """Stands in for a Streamlit rerun stopping the script thread."""
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def start(target):
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread
+
+
+@pytest.fixture
+def waiting(monkeypatch):
+    """Counts callers blocked on an in-flight call, so tests release the leader only once they all wait."""
+    count = []
+
+    class CountingEvent(threading.Event):
+        def wait(self, timeout=None):
+            count.append(1)
+            return super().wait(timeout)
+
+    monkeypatch.setattr(cache, "threading", SimpleNamespace(Lock=threading.Lock, Event=CountingEvent))
+    return lambda: len(count)
+
+
+def test_concurrent_calls_share_one_computation(waiting):
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return "profile"
+
+    threads = [start(lambda: results.append(flights.do("url", compute))) for _ in range(5)]
+    wait_until(lambda: len(calls) == 1 and waiting() == 4)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert calls == [1]
+    assert results == ["profile"] * 5
+    assert flights.in_flight() == 0
+
+
+def test_errors_reach_every_waiter_and_are_not_cached(waiting):
+    flights = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def fail():
+        release.wait(5)
+        raise ValueError("scrape failed")
+
+    def call():
+        try:
+            flights.do("url", fail)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [start(call) for _ in range(3)]
+    wait_until(lambda: flights.in_flight() == 1 and waiting() == 2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert errors == ["scrape failed"] * 3
+    assert flights.do("url", lambda: "retried") == "retried"
+
+
+def test_waiter_takes_over_when_the_leader_is_interrupted(waiting):
+    flights = SingleFlight()
+    leader_started = threading.Event()
+    interrupt = threading.Event()
+    results = []
+
+    def interrupted():
+        leader_started.set()
+        interrupt.wait(5)
+        raise Interrupted()
+
+    def leader():
+        with pytest.raises(Interrupted):
+            flights.do("url", interrupted)
+
+    leader_thread = start(leader)
+    leader_started.wait(5)
+    waiter = start(lambda: results.append(flights.do("url", lambda: "taken over")))
+    wait_until(lambda: waiting() == 1)
+    interrupt.set()
+    leader_thread.join(5)
+    waiter.join(5)
+    assert results == ["taken over"]
+    assert flights.in_flight() == 0
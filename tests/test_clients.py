@@ -0,0 +1,113 @@
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from google.genai import errors
+import clients
+from scheduler import RequestScheduler
+
+
+def api_error(code):
+    error = errors.ClientError if code < 500 else errors.ServerError
+    return error(code, {"error": {"code": code, "message": "failed", "status": "UNAVAILABLE"}})
+
+
+class ScriptedModels:
+    """Raises or returns the scripted outcomes in order, one per request."""
+
+    def __init__(self, outcomes, delay=0.0):
+        self.outcomes = list(outcomes)
+        self.delay = delay
+        self.calls = 0
+
+    def next_outcome(self):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    def generate_content(self, model, contents, config=None):
+        time.sleep(self.delay)
+        return SimpleNamespace(text=self.next_outcome(), usage_metadata=None)
+
+    def generate_content_stream(self, model, contents, config=None):
+        for chunk in self.next_outcome():
+            if isinstance(chunk, BaseException):
+                raise chunk
+            yield SimpleNamespace(text=chunk, usage_metadata=None)
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    scheduler = RequestScheduler()
+    monkeypatch.setattr(clients, "scheduler", scheduler)
+    monkeypatch.setattr(clients, "backoff_delay", lambda attempt: 0.0)
+    return scheduler
+
+
+def use(monkeypatch, models):
+    monkeypatch.setattr(clients, "get_gemini_client", lambda: SimpleNamespace(models=models))
+    return models
+
+
+def test_rate_limit_and_server_errors_are_retried(monkeypatch, scheduler):
+    models = use(monkeypatch, ScriptedModels([api_error(429), api_error(503), "ok"]))
+    assert clients.generate_content("model", "prompt").text == "ok"
+    assert models.calls == 3
+    assert scheduler.stats()["in_flight"] == 0 and scheduler.completed == 3
+
+
+def test_client_errors_are_not_retried(monkeypatch, scheduler):
+    models = use(monkeypatch, ScriptedModels([api_error(400), "ok"]))
+    with pytest.raises(errors.ClientError):
+        clients.generate_content("model", "prompt")
+    assert models.calls == 1
+
+
+def test_retries_stop_after_max_retries(monkeypatch, scheduler):
+    monkeypatch.setattr(clients, "GEMINI_MAX_RETRIES", 2)
+    models = use(monkeypatch, ScriptedModels([api_error(503)] * 5))
+    with pytest.raises(errors.ServerError):
+        clients.generate_content("model", "prompt")
+    assert models.calls == 3
+
+
+def test_no_retry_past_the_deadline(monkeypatch, scheduler):
+    monkeypatch.setattr(clients, "backoff_delay", lambda attempt: 10.0)
+    models = use(monkeypatch, ScriptedModels([api_error(503), "ok"]))
+    with pytest.raises(errors.ServerError):
+        clients.generate_content("model", "prompt", timeout=5)
+    assert models.calls == 1
+
+
+def test_hedged_request_answers_when_the_first_is_slow(monkeypatch, scheduler):
+    release = threading.Event()
+
+    class SlowFirst(ScriptedModels):
+        def generate_content(self, model, contents, config=None):
+            if self.calls == 0:
+                self.calls += 1
+                release.wait(5)
+                return SimpleNamespace(text="slow", usage_metadata=None)
+            return super().generate_content(model, contents, config)
+
+    use(monkeypatch, SlowFirst(["fast"]))
+    try:
+        assert clients.generate_content("model", "prompt", hedge_after=0.01).text == "fast"
+    finally:
+        release.set()
+
+
+def test_stream_is_retried_only_before_the_first_chunk(monkeypatch, scheduler):
+    models = use(monkeypatch, ScriptedModels([[api_error(429)], ["a", "b"]]))
+    assert [chunk.text for chunk in clients.generate_content_stream("model", "prompt")] == ["a", "b"]
+    assert models.calls == 2
+
+    models = use(monkeypatch, ScriptedModels([["a", api_error(503)], ["never"]]))
+    chunks = []
+    with pytest.raises(errors.ServerError):
+        for chunk in clients.generate_content_stream("model", "prompt"):
+            chunks.append(chunk.text)
+    assert chunks == ["a"] and models.calls == 1
+    assert scheduler.stats()["in_flight"] == 0
@@ -0,0 +1,9 @@
+from datetime import date
+from fakes import synthetic_profile
+from features import total_experience_months
+
+
+def test_synthetic_experience_dates_parse():
+    for index in range(200):
+        experiences = synthetic_profile(index)["experiences"]
+        assert total_experience_months(experiences, date(2025, 6, 15)), experiences
@@ -0,0 +1,52 @@
+from datetime import date
+from features import extract_profile_features, total_experience_months
+
+TODAY = date(2025, 6, 15)
+
+
+def months(*captions):
+    return total_experience_months([{"caption": caption} for caption in captions], TODAY)
+
+
+def test_month_ranges_include_the_end_month():
+    assert months("Jan 2020 - Dec 2020 · 1 yr") == 12
+    assert months("Mar 2021 – Mar 2021") == 1
+
+
+def test_year_only_ranges():
+    assert months("2016 - 2019") == 36
+
+
+def test_present_runs_to_today():
+    assert months("Jan 2025 - Present · 6 mos") == 6
+
+
+def test_overlapping_roles_count_once():
+    assert months("Jan 2020 - Dec 2021", "Jun 2021 - Dec 2022", "Jan 2024 - Dec 2024") == 48
+
+
+def test_duration_only_captions():
+    assert months("Full-time · 2 yrs 3 mos", "Contract · 5 mos") == 32
+
+
+def test_inverted_or_unparseable_ranges_need_the_llm():
+    assert months("Jan 2019 - 2016") is None
+    assert months("Freelance") is None
+    assert months() is None
+
+
+def test_features_leave_out_what_they_cannot_infer():
+    item = {"headline": "Engineer", "experiences": [{"title": "Senior Engineer", "caption": "Freelance"}]}
+    features = extract_profile_features(item, TODAY)
+    assert features["role_type"] == "Senior Engineer"
+    assert features["recent_career_type"] == "freelance"
+    assert "total_work_experience" not in features and "experience_level" not in features
+
+
+def test_features_from_dated_experience():
+    item = {"experiences": [{"title": "Director of Engineering", "subtitle": "Acme · Full-time", "caption": "Jan 2015 - Present"}]}
+    features = extract_profile_features(item, TODAY)
+    assert features["total_work_experience"] == 10.5
+    assert features["experience_level"] == "senior"
+    assert features["career_stage"] == "Director"
+    assert features["recent_career_type"] == "leadership"
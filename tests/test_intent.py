@@ -0,0 +1,42 @@
+import pytest
+import handlers
+from intent import KEYWORD_CONFIDENCE, IntentClassifier, classify_locally
+
+EXAMPLES = {
+    "content_rewrite_or_generation": ["polish my headline", "improve my about text"],
+    "career_counseling_skill_gap_analysis": ["what should I learn next", "which courses help me grow"],
+    "general_prompt_handler": ["hello there", "thanks for the help"],
+}
+
+
+def test_single_keyword_rule_routes_with_fixed_confidence():
+    assert classify_locally("Rewrite my headline") == ("content_rewrite_or_generation", KEYWORD_CONFIDENCE)
+    assert classify_locally("What skill gaps do I have?") == ("career_counseling_skill_gap_analysis", KEYWORD_CONFIDENCE)
+
+
+def test_conflicting_rules_are_decided_by_the_model_among_the_matches():
+    intent, confidence = classify_locally("rewrite my summary and tell me my skill gaps")
+    assert intent in ("content_rewrite_or_generation", "career_counseling_skill_gap_analysis")
+    assert confidence < KEYWORD_CONFIDENCE
+
+
+def test_query_without_known_words_has_no_confidence():
+    assert classify_locally("zzzz qqq") == ("general_prompt_handler", 0.0)
+
+
+def test_naive_bayes_probabilities():
+    model = IntentClassifier(EXAMPLES)
+    probabilities, known = model.probabilities("what courses should I learn")
+    assert known
+    assert sum(probabilities.values()) == pytest.approx(1.0)
+    assert max(probabilities, key=probabilities.get) == "career_counseling_skill_gap_analysis"
+    assert model.predict("hello, thanks")[0] == "general_prompt_handler"
+
+
+def test_low_confidence_falls_back_to_the_llm(monkeypatch):
+    asked = []
+    monkeypatch.setattr(handlers, "classify_with_llm", lambda user_input, priority: asked.append(priority) or "profile_analysis")
+    assert handlers.classify_user_intent("Rewrite my headline") == "content_rewrite_or_generation"
+    assert asked == []
+    assert handlers.classify_user_intent("zzzz qqq", "background") == "profile_analysis"
+    assert asked == ["background"]
@@ -0,0 +1,113 @@
+from memory import BM25Index, ConversationMemory, estimate_tokens, local_summarizer
+
+
+def conversation(turns, size=400):
+    messages = []
+    for turn in range(turns):
+        messages.append({"role": "user", "content": f"question {turn} " + "x" * size})
+        messages.append({"role": "assistant", "content": f"answer {turn} " + "y" * size})
+    return messages
+
+
+class RecordingSummarizer:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, summary, messages, token_limit):
+        self.calls.append([message["content"].split()[1] for message in messages])
+        return local_summarizer(summary, messages, token_limit)
+
+
+def test_short_history_renders_nothing():
+    memory = ConversationMemory()
+    assert memory.render([]) == ""
+    assert memory.render(conversation(1)[:1]) == ""
+
+
+def test_render_stays_within_the_token_budget():
+    memory = ConversationMemory(token_budget=1000)
+    messages = conversation(30)
+    rendered = memory.render(messages)
+    # the fixed header and footer lines are outside the budget
+    assert estimate_tokens(rendered) <= 1000 + 100
+    assert messages[-1]["content"] in rendered
+    assert "Summary of earlier conversation" in rendered
+
+
+def test_budget_holds_as_the_conversation_grows():
+    memory = ConversationMemory(token_budget=1000)
+    messages = conversation(30, size=150)
+    for end in range(2, len(messages) + 1):
+        assert estimate_tokens(memory.render(messages[:end])) <= 1000 + 100
+
+
+def test_newest_message_is_kept_even_over_budget():
+    memory = ConversationMemory(token_budget=100)
+    messages = conversation(2, size=2000)
+    assert messages[-1]["content"] in memory.render(messages)
+
+
+def test_summary_is_only_extended_with_new_messages():
+    summarizer = RecordingSummarizer()
+    memory = ConversationMemory(token_budget=1000, summarizer=summarizer)
+    messages = conversation(10)
+    memory.render(messages)
+    first_calls = len(summarizer.calls)
+    # an unchanged history is served from the rendered cache
+    memory.render(messages)
+    assert len(summarizer.calls) == first_calls
+    messages += conversation(12)[20:]
+    memory.render(messages)
+    folded = [turn for call in summarizer.calls for turn in call]
+    # every message is folded in at most once, in order
+    assert folded == [message["content"].split()[1] for message in messages[:memory.summarized]]
+
+
+def test_cleared_history_resets_the_memory():
+    memory = ConversationMemory(token_budget=500)
+    memory.render(conversation(10))
+    assert memory.summary
+    rendered = memory.render(conversation(1, size=10))
+    assert "Summary of earlier conversation" not in rendered
+    assert memory.summarized == 0
+
+
+def test_local_summarizer_drops_oldest_lines_over_the_limit():
+    messages = conversation(20, size=40)
+    summary = local_summarizer("", messages, token_limit=100)
+    assert estimate_tokens(summary) <= 100
+    assert "answer 19" in summary and "question 0" not in summary
+
+
+def test_bm25_ranks_matching_documents_first():
+    index = BM25Index()
+    for text in ("kubernetes cluster upgrades", "salary negotiation tips", "negotiation for a senior salary band"):
+        index.add(text)
+    # the shorter document matching both terms scores higher
+    assert [doc_id for doc_id, _ in index.search("salary negotiation", top_k=5)] == [1, 2]
+    assert index.search("unrelated words", top_k=5) == []
+    # `limit` restricts the search to the oldest documents
+    assert [doc_id for doc_id, _ in index.search("senior salary", top_k=5, limit=2)] == [1]
+
+
+def test_relevant_old_pair_is_pulled_back_in():
+    memory = ConversationMemory(token_budget=1000, retrieval_top_k=2)
+    messages = [{"role": "user", "content": "How should I negotiate my salary offer?"},
+                {"role": "assistant", "content": "Anchor high and cite market data."}]
+    messages += conversation(20)
+    messages.append({"role": "user", "content": "Back to the salary offer, what next?"})
+    rendered = memory.render(messages)
+    retrieved = rendered.split("Earlier messages relevant to the current question:\n")[1].split("\n\nRecent messages:")[0]
+    assert "User: How should I negotiate my salary offer?" in retrieved
+    # the answer comes back with its question
+    assert "Assistant: Anchor high and cite market data." in retrieved
+
+
+def test_retrieval_respects_its_share_of_the_budget():
+    memory = ConversationMemory(token_budget=1000, retrieval_top_k=4)
+    messages = conversation(20, size=2000)
+    messages.append({"role": "user", "content": "question 3 again"})
+    messages.append({"role": "assistant", "content": "ok"})
+    for message in messages:
+        memory.index.add(message["content"])
+    assert sum(estimate_tokens(text) for _, text in memory.retrieve(messages, "question 3", len(messages) - 2)) <= memory.retrieval_limit + 1
@@ -0,0 +1,66 @@
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+import prefetch
+from scheduler import RequestScheduler
+
+QUERY = "Improve my headline"
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def background(monkeypatch):
+    """A prefetcher whose answers each take one request slot of a private scheduler."""
+    state = SimpleNamespace(scheduler=RequestScheduler(max_concurrency=1), generating=threading.Event(),
+                            finish=threading.Event(), requests=0, cached=False)
+
+    def process_user_query(session, query, handler_name, standalone):
+        if state.cached:
+            return "cached answer"
+        with state.scheduler.slot(10, session.priority):
+            state.requests += 1
+            state.generating.set()
+            state.finish.wait(5)
+            return "prefetched answer"
+
+    monkeypatch.setattr(prefetch.Session, "copy_of", classmethod(lambda cls, session, priority: SimpleNamespace(priority=priority)))
+    monkeypatch.setattr(prefetch, "quick_actions", lambda session: [("Headline", QUERY, "content_rewrite_or_generation")])
+    monkeypatch.setattr(prefetch, "process_user_query", process_user_query)
+    yield state
+    state.finish.set()
+
+
+def test_admitted_prefetch_is_awaited(background):
+    prefetcher = prefetch.QuickActionPrefetcher(SimpleNamespace())
+    background.generating.wait(5)
+    threading.Timer(0.05, background.finish.set).start()
+    assert prefetcher.take(QUERY) == "prefetched answer"
+
+
+def test_prefetch_waiting_for_a_slot_is_withdrawn(background):
+    # interactive traffic holds the only slot
+    background.scheduler.acquire(10)
+    prefetcher = prefetch.QuickActionPrefetcher(SimpleNamespace())
+    wait_until(lambda: background.scheduler.stats()["queued"]["background"] == 1)
+    started = time.monotonic()
+    assert prefetcher.take(QUERY) is None
+    assert time.monotonic() - started < 1
+    # once the slot frees up, the withdrawn prefetch leaves the queue without sending its request
+    background.scheduler.release()
+    wait_until(lambda: background.scheduler.stats()["queue_depth"] == 0)
+    assert background.requests == 0
+    assert background.scheduler.stats()["in_flight"] == 0
+
+
+def test_prefetch_answered_from_the_cache_is_used(background):
+    background.cached = True
+    prefetcher = prefetch.QuickActionPrefetcher(SimpleNamespace())
+    wait_until(lambda: prefetcher.futures[QUERY].done())
+    assert prefetcher.take(QUERY) == "cached answer"
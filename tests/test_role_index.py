@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+import pytest
+import handlers
+from role_index import RoleMatch, role_index
+
+SKILLS = ["Python", "Machine Learning", "SQL", "Statistics"]
+
+
+def test_titles_match_roles_that_share_most_of_their_words():
+    for job_title, role in [("Senior Data Scientist", "Data Scientist"), ("Data Scientist II", "Data Scientist"),
+                            ("software engineer", "Software Engineer")]:
+        assert role_index.roles[role_index.find_role(job_title)][0] == role
+
+
+@pytest.mark.parametrize("job_title", ["Prompt Engineer", "Chief Happiness Officer", "Head of Marketing", "Manager"])
+def test_titles_sharing_one_word_are_unknown(job_title):
+    assert role_index.find_role(job_title) is None
+    assert role_index.estimate(job_title, SKILLS) is None
+
+
+def test_estimate_is_scored_against_the_matched_role():
+    match = role_index.estimate("Senior Data Scientist", SKILLS, ["Data Scientist"])
+    assert match.title == "Data Scientist"
+    assert match.title_similarity == 1.0
+    assert set(match.matched_skills) <= {"python", "machine learning", "sql", "statistics"}
+    assert 0 < match.score <= 100
+
+
+def test_unknown_titles_get_the_llm_slots_first(monkeypatch):
+    monkeypatch.setattr(handlers, "JOB_FIT_LLM_TOP_N", 1)
+    monkeypatch.setattr(handlers, "job_fit_score_prompt", lambda session, context, job_title: job_title)
+    monkeypatch.setattr(handlers, "generate_validated", lambda task, prompt, *args, **kwargs: handlers.JobFitScore(
+        match_score=70, missing_skills=[], keywords=[]))
+    profile = SimpleNamespace(skills=SKILLS, experiences=[("Data Scientist", "Acme", "")])
+    session = SimpleNamespace(profile=profile, prompt_cache=None, priority="interactive")
+    context = SimpleNamespace(experience_level="mid-level")
+    results = dict(handlers.score_job_titles(session, context, ["Data Scientist", "Prompt Engineer"]))
+    assert isinstance(results["Prompt Engineer"], handlers.JobFitScore)
+    assert isinstance(results["Data Scientist"], RoleMatch)
+    table = handlers.job_fit_table(list(results.items()))
+    assert "(local estimate as Data Scientist)" in table
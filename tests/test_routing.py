@@ -0,0 +1,22 @@
+from handlers import parse_routed_response, strip_handler_line
+
+
+def stream(chunks):
+    span = {}
+    return "".join(strip_handler_line(chunks, span)), span["handler"]
+
+
+def test_stream_keeps_whitespace_between_chunks():
+    assert stream(["HANDLER: profile_analysis\nYour profile ", "looks strong."]) == ("Your profile looks strong.", "profile_analysis")
+
+
+def test_stream_handler_line_split_across_chunks():
+    assert stream(["HAND", "LER: job_fit_analysis", "\n", "A ", "b"]) == ("A b", "job_fit_analysis")
+
+
+def test_stream_without_handler_line_is_passed_through():
+    assert stream(["no handler ", "here\nmore"]) == ("no handler here\nmore", "general_prompt_handler")
+
+
+def test_unknown_handler_falls_back_to_general():
+    assert parse_routed_response("**HANDLER: astrology**\nHi") == ("general_prompt_handler", "Hi")
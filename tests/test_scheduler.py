@@ -0,0 +1,80 @@
+import threading
+import time
+import pytest
+from scheduler import RequestScheduler, TokenBucket
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_waiting_requests_are_admitted_in_priority_order():
+    scheduler = RequestScheduler(max_concurrency=1)
+    scheduler.acquire(10)
+    admitted = []
+
+    def request(priority):
+        with scheduler.slot(10, priority):
+            admitted.append(priority)
+
+    threads = []
+    for count, priority in enumerate(("batch", "background", "interactive"), 1):
+        threads.append(threading.Thread(target=request, args=(priority,)))
+        threads[-1].start()
+        wait_until(lambda: scheduler.stats()["queue_depth"] == count)
+    scheduler.release()
+    for thread in threads:
+        thread.join(5)
+    assert admitted == ["interactive", "background", "batch"]
+    assert scheduler.stats()["completed"] == 4
+
+
+def test_concurrency_is_capped():
+    scheduler = RequestScheduler(max_concurrency=2)
+    release = threading.Event()
+    peak = []
+
+    def request():
+        with scheduler.slot(10):
+            peak.append(scheduler.in_flight)
+            release.wait(5)
+
+    threads = [threading.Thread(target=request) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: scheduler.stats()["queue_depth"] == 3)
+    assert scheduler.in_flight == 2
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert max(peak) == 2
+    assert scheduler.stats()["in_flight"] == 0
+
+
+def test_timeout_leaves_the_queue():
+    scheduler = RequestScheduler(max_concurrency=1)
+    scheduler.acquire(10)
+    with pytest.raises(TimeoutError):
+        scheduler.acquire(10, timeout=0.05)
+    assert scheduler.stats()["queue_depth"] == 0
+    scheduler.release()
+    # the timed-out ticket must not block the next request
+    scheduler.acquire(10, timeout=1)
+    assert scheduler.in_flight == 1
+
+
+def test_token_budget_delays_admission():
+    bucket = TokenBucket(per_minute=600)
+    assert bucket.wait_time(600, time.monotonic()) == 0
+    bucket.take(600)
+    assert bucket.wait_time(10, bucket.updated) == pytest.approx(1.0)
+    # requests larger than the bucket only wait for a full one
+    assert bucket.wait_time(10_000, bucket.updated) == pytest.approx(60.0)
+
+    scheduler = RequestScheduler(tokens_per_minute=600)
+    scheduler.acquire(600)
+    with pytest.raises(TimeoutError):
+        scheduler.acquire(100, timeout=0.05)
@@ -0,0 +1,147 @@
+import pytest
+import session_store
+from memory import ConversationMemory
+from session_store import SQLiteSessionStore, history_view, load_window, trim_loaded
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_store, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def store(clock):
+    return SQLiteSessionStore(":memory:", idle_ttl=0)
+
+
+def message(n, size=10):
+    return {"role": "user" if n % 2 == 0 else "assistant", "content": f"message {n} " + "x" * size}
+
+
+def fill(store, session_id, count, size=10):
+    return [store.append_message(session_id, message(n, size)) for n in range(count)]
+
+
+def contents(messages):
+    return [int(message["content"].split()[1]) for message in messages]
+
+
+def test_messages_are_numbered_and_paged_by_seq(store):
+    assert fill(store, "a", 10) == list(range(10))
+    assert fill(store, "b", 2) == [0, 1]
+    latest = store.load_messages("a", limit=4)
+    assert [message["seq"] for message in latest] == [6, 7, 8, 9]
+    assert contents(store.load_messages("a", before=6, limit=4)) == [2, 3, 4, 5]
+    assert contents(store.load_messages("a", before=2, limit=4)) == [0, 1]
+    assert store.load_messages("a", before=0) == []
+
+
+def test_large_bodies_round_trip_compressed(store):
+    store.append_message("a", message(0, size=5000))
+    stored = store._conn.execute("SELECT body FROM messages").fetchone()[0]
+    assert len(stored) < 1000
+    assert store.load_messages("a")[0]["content"] == message(0, size=5000)["content"]
+
+
+def test_update_and_clear(store):
+    fill(store, "a", 3)
+    store.update_message("a", 1, {"role": "assistant", "content": "message 1 regenerated", "seq": 1})
+    assert store.load_messages("a")[1] == {"role": "assistant", "content": "message 1 regenerated", "seq": 1}
+    store.clear_messages("a")
+    assert store.load_messages("a") == []
+    # numbering starts over after a clear
+    assert store.append_message("a", message(0)) == 0
+
+
+def test_state_of_unknown_session_is_none(store):
+    assert store.load_state("missing") is None
+    store.save_state("a", {"job_titles": ["Data Scientist"]})
+    assert store.load_state("a") == {"job_titles": ["Data Scientist"]}
+
+
+def test_idle_sessions_are_evicted(store, clock):
+    store.save_state("idle", {"n": 1})
+    fill(store, "idle", 3)
+    clock.now += 100
+    store.save_state("active", {"n": 2})
+    clock.now += 100
+    # reading a session counts as activity
+    store.load_state("active")
+    assert store.evict_idle(150) == 1
+    assert store.load_state("idle") is None and store.load_messages("idle") == []
+    assert store.load_state("active") == {"n": 2}
+
+
+def test_history_view_slides_once_it_spans_max_pages():
+    assert history_view(40, 1, 4, 3) == (36, 40)
+    assert history_view(40, 3, 4, 3) == (28, 40)
+    # paging back further moves the whole view instead of growing it
+    assert history_view(40, 4, 4, 3) == (24, 36)
+    assert history_view(40, 10, 4, 3) == (0, 12)
+    assert history_view(6, 3, 4, 3) == (0, 6)
+    assert history_view(0, 1, 4, 3) == (0, 0)
+
+
+class CountingStore:
+    def __init__(self, store):
+        self.store = store
+        self.read = 0
+
+    def load_messages(self, session_id, before=None, limit=20):
+        messages = self.store.load_messages(session_id, before, limit)
+        self.read += len(messages)
+        return messages
+
+
+def test_load_window_reads_only_missing_messages(store):
+    fill(store, "a", 40)
+    counting = CountingStore(store)
+    window = load_window(counting, "a", [], 24, 36)
+    assert [message["seq"] for message in window] == list(range(24, 36))
+    assert counting.read == 12
+    # sliding back a page drops the newest one and reads one older page
+    window = load_window(counting, "a", window, 20, 32)
+    assert [message["seq"] for message in window] == list(range(20, 32))
+    assert counting.read == 16
+    # and sliding forward reads it back
+    window = load_window(counting, "a", window, 24, 36)
+    assert [message["seq"] for message in window] == list(range(24, 36))
+    assert counting.read == 20
+    assert load_window(counting, "a", window, 5, 5) == []
+
+
+def test_trim_loaded_folds_dropped_messages_into_memory(store):
+    fill(store, "a", 30, size=300)
+    history = store.load_messages("a", limit=30)
+    memory = ConversationMemory(token_budget=3000)
+    memory.render(history)
+    summarized = memory.summarized
+    assert 0 < summarized < 20
+    assert trim_loaded(history, memory, 40, 10) == []
+    dropped = trim_loaded(history, memory, 25, 10)
+    assert contents(dropped) == list(range(20)) and contents(history) == list(range(20, 30))
+    # everything dropped is in the summary, and positions now count from the kept messages
+    assert memory.summarized == 0
+    assert "message 19" in memory.summary
+    assert len(memory.index) == 10
+    assert "message 29" in memory.render(history)
+
+
+def test_forget_summarizes_messages_not_yet_folded_in():
+    history = [message(n) for n in range(6)]
+    memory = ConversationMemory(token_budget=2000)
+    memory.render(history)
+    assert memory.summarized == 0
+    memory.forget(history, 4)
+    assert memory.summarized == 0
+    assert "message 3" in memory.summary and "message 4" not in memory.summary